@@ -0,0 +1,5 @@
+#!/usr/bin/bash
+
+export PYTHONPATH=$(pwd)/src
+
+python -m site_generator.benchmark "$@"
@@ -2,6 +2,6 @@
 
 export PYTHONPATH=$(pwd)/src
 
-python src/site_generator/main.py
+python src/site_generator/main.py "$@"
 
 cd public && python -m http.server 8888
\ No newline at end of file
@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import shutil
+import filecmp
+import hashlib
+import posixpath
+
+try:
+    import fcntl
+except ImportError:
+    # not available on windows, files are just copied there
+    fcntl = None
+
+
+# linux ioctl sharing the data blocks of two files on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def _clone_file(src, dst) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        return False
+
+    return True
+
+
+def _copy_file_range(src, dst) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    try:
+        # the copy happens in the kernel, without moving the data through user space
+        while os.copy_file_range(src.fileno(), dst.fileno(), 1 << 30):
+            pass
+    except OSError:
+        # start over with a plain copy (e.g. across filesystems on old kernels)
+        src.seek(0)
+        dst.seek(0)
+        dst.truncate()
+        return False
+
+    return True
+
+
+def transfer_file(from_path : str, dest_path : str, link : bool = False) -> str:
+    """
+    puts a copy of 'from_path' at 'dest_path' with the cheapest method the filesystem allows:
+    a hardlink (only if 'link' is True), a reflink, os.copy_file_range or a plain copy.
+    The modification time is preserved so that unchanged files can be recognized by
+    size and mtime. Returns the method used: "link", "reflink", "copy_file_range" or "copy"
+    """
+    dest_dir = os.path.dirname(dest_path)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+
+    # never write through an old output, it could be a hardlink to a source file
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+
+    if link:
+        try:
+            os.link(from_path, dest_path)
+            return "link"
+        except OSError:
+            # e.g. source and destination on different devices
+            pass
+
+    with open(from_path, "rb") as src, open(dest_path, "wb") as dst:
+        if _clone_file(src, dst):
+            method = "reflink"
+        elif _copy_file_range(src, dst):
+            method = "copy_file_range"
+        else:
+            shutil.copyfileobj(src, dst)
+            method = "copy"
+
+    shutil.copystat(from_path, dest_path)
+
+    return method
+
+
+def replace_if_changed(tmp_path : str, dest_path : str) -> bool:
+    """
+    moves the freshly written 'tmp_path' to 'dest_path' in a single rename, unless
+    'dest_path' already has the same content: then the temporary file is dropped and
+    the output keeps its modification time, so that rsync, CDN syncs and browser
+    caches do not see a change. Returns whether 'dest_path' changed
+    """
+    if os.path.isfile(dest_path) and filecmp.cmp(tmp_path, dest_path, shallow=False):
+        os.remove(tmp_path)
+        return False
+
+    os.replace(tmp_path, dest_path)
+    return True
+
+
+def write_if_changed(path : str, text : str) -> bool:
+    """
+    writes 'text' to 'path' atomically (see replace_if_changed),
+    returns whether the content of 'path' changed
+    """
+    if os.path.isfile(path):
+        with open(path) as file:
+            if file.read() == text:
+                return False
+
+    dest_dir = os.path.dirname(path)
+    if dest_dir:
+        os.makedirs(dest_dir, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return True
+
+
+# characters of the content hash put in the name of a fingerprinted asset
+FINGERPRINT_LENGTH = 10
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+# href="..." and src="..." attributes in html
+html_url_pattern = re.compile(r'((?:href|src)\s*=\s*")([^"]*)(")')
+
+
+def fingerprinted_name(path : str, file_hash : str) -> str:
+    """
+    name of the immutable copy of an asset, with its content hash before the extension e.g.
+
+    fingerprinted_name("images/index.css", "3f9a1c07be...") == "images/index.3f9a1c07be.css"
+    """
+    root, extension = posixpath.splitext(path)
+    return f"{root}.{file_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def write_asset_manifest(dest_dir : str, urls : dict[str, str]) -> bool:
+    return write_if_changed(f"{dest_dir}/{ASSET_MANIFEST_NAME}", json.dumps(urls, indent=1, sort_keys=True))
+
+
+# site url -> fingerprinted url of every asset, None when fingerprinting is off
+_fingerprints = None
+_fingerprints_digest = ""
+
+
+def enable_fingerprints(urls : dict[str, str]) -> None:
+    global _fingerprints, _fingerprints_digest
+    _fingerprints = urls
+    # the html of the pages depends on the urls, the caches of rendered html are keyed with this
+    _fingerprints_digest = hashlib.blake2b(json.dumps(urls, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def disable_fingerprints() -> None:
+    global _fingerprints, _fingerprints_digest
+    _fingerprints = None
+    _fingerprints_digest = ""
+
+
+def fingerprints() -> dict[str, str]:
+    return _fingerprints
+
+
+def fingerprints_digest() -> str:
+    return _fingerprints_digest
+
+
+def fingerprinted_url(url : str) -> str:
+    """
+    returns the fingerprinted url of an asset linked by its site path (e.g. '/index.css'),
+    any other url is returned as it is
+    """
+    if _fingerprints is None:
+        return url
+
+    path, separator, rest = url.partition('#')
+    path, query_separator, query = path.partition('?')
+    hashed_path = _fingerprints.get(path)
+    if hashed_path is None:
+        return url
+
+    return f"{hashed_path}{query_separator}{query}{separator}{rest}"
+
+
+def rewrite_html_urls(html : str) -> str:
+    if _fingerprints is None:
+        return html
+
+    return html_url_pattern.sub(lambda match: f"{match.group(1)}{fingerprinted_url(match.group(2))}{match.group(3)}", html)
+
+
+def fingerprinted_template(template):
+    """
+    returns 'template' with the asset urls of its html rewritten, computed once per template
+    """
+    if _fingerprints is None:
+        return template
+
+    return template.derive("fingerprints", _fingerprints_digest, rewrite_html_urls)
@@ -0,0 +1,471 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, the peak rss is just not reported there
+    resource = None
+
+from site_generator import generator
+from site_generator import minify
+from site_generator.textnode import MDBlockType, TextNode, TextNodeType
+from site_generator.htmlnode import LeafNode
+from site_generator.textnode_utils import markdown_to_blocks, block_to_block_type, scan_markdown_blocks, text_to_textnode, text_node_to_html_node
+from site_generator.htmlnode_utils import markdown_to_html_node
+
+
+# indented like the template of the site, so that --minify has the same whitespace to remove
+BENCHMARK_TEMPLATE = """<!DOCTYPE html>
+<html>
+
+<head>
+    <meta charset="utf-8">
+    <title> {{ Title }} </title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+
+</html>
+"""
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do",
+         "eiusmod", "tempor", "incididunt", "ut", "labore", "et", "dolore", "magna", "aliqua"]
+
+# relative frequency of each block type in the synthetic pages
+DEFAULT_BLOCK_MIX = {
+    "paragraph" : 6,
+    "heading" : 2,
+    "code" : 1,
+    "quote" : 1,
+    "unordered_list" : 1,
+    "ordered_list" : 1,
+}
+
+
+def random_inline_text(rng : random.Random, words : int, inline_density : float) -> str:
+    """
+    returns 'words' random words, each one turned into an inline element
+    (bold, italic, code, link or image) with probability 'inline_density'
+    """
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < inline_density:
+            kind = rng.randrange(5)
+            if kind == 0:
+                word = f"**{word}**"
+            elif kind == 1:
+                word = f"*{word}*"
+            elif kind == 2:
+                word = f"`{word}`"
+            elif kind == 3:
+                word = f"[{word}](/{word})"
+            else:
+                word = f"![{word}](/images/{word}.png)"
+        parts.append(word)
+
+    return " ".join(parts)
+
+
+def random_block(rng : random.Random, block_type : str, inline_density : float) -> str:
+    if block_type == "heading":
+        return f"{'#' * rng.randint(2, 6)} {random_inline_text(rng, 4, inline_density)}"
+
+    if block_type == "code":
+        lines = [f"print('{rng.choice(WORDS)}')" for _ in range(rng.randint(2, 8))]
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    if block_type == "quote":
+        return "\n".join(f"> {random_inline_text(rng, 12, inline_density)}" for _ in range(rng.randint(1, 4)))
+
+    if block_type == "unordered_list":
+        return "\n".join(f"- {random_inline_text(rng, 8, inline_density)}" for _ in range(rng.randint(2, 6)))
+
+    if block_type == "ordered_list":
+        return "\n".join(f"{i}. {random_inline_text(rng, 8, inline_density)}" for i in range(1, rng.randint(3, 7)))
+
+    words = random_inline_text(rng, rng.randint(20, 80), inline_density).split(" ")
+    sentences = []
+    while words:
+        length = rng.randint(6, 14)
+        sentences.append(" ".join(words[:length]) + ".")
+        words = words[length:]
+
+    # typed like hand written markdown, with two spaces between sentences and hard wrapped, which --minify collapses
+    return "\n".join("  ".join(sentences[i:i + 2]) for i in range(0, len(sentences), 2))
+
+
+def random_page(rng : random.Random, title : str, blocks : int, block_mix : dict, inline_density : float) -> str:
+    block_types = list(block_mix)
+    weights = [block_mix[block_type] for block_type in block_types]
+
+    page_blocks = [f"# {title}"]
+    for block_type in rng.choices(block_types, weights, k=blocks):
+        page_blocks.append(random_block(rng, block_type, inline_density))
+
+    return "\n\n".join(page_blocks) + "\n"
+
+
+def generate_corpus(dir_path : str,
+                    pages : int = 200,
+                    blocks : int = 40,
+                    block_mix : dict = None,
+                    inline_density : float = 0.2,
+                    nesting : int = 2,
+                    seed : int = 0
+    ) -> list[str]:
+    """
+    writes 'pages' synthetic markdown pages of 'blocks' blocks each under 'dir_path',
+    spread over directories nested up to 'nesting' levels deep. The same seed always
+    gives the same corpus. Returns the paths of the written pages
+    """
+    rng = random.Random(seed)
+    block_mix = block_mix or DEFAULT_BLOCK_MIX
+
+    paths = []
+    for i in range(pages):
+        depth = rng.randint(0, nesting)
+        sub_dirs = "".join(f"/section{rng.randrange(4)}" for _ in range(depth))
+        path = f"{dir_path}{sub_dirs}/page{i}.md"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(random_page(rng, f"Page {i}", blocks, block_mix, inline_density))
+        paths.append(path)
+
+    return paths
+
+
+def time_stages(markdowns : list[str]) -> dict[str, float]:
+    """
+    returns the total seconds spent by each stage of the markdown -> html pipeline over all the pages
+    """
+    timings = dict.fromkeys(["markdown_to_blocks", "block_to_block_type", "scan_markdown_blocks", "text_to_textnode", "markdown_to_html_node", "to_html"], 0.0)
+    clock = time.perf_counter
+
+    for markdown in markdowns:
+        start = clock()
+        blocks = markdown_to_blocks(markdown)
+        timings["markdown_to_blocks"] += clock() - start
+
+        start = clock()
+        block_types = [block_to_block_type(block) for block in blocks]
+        timings["block_to_block_type"] += clock() - start
+
+        start = clock()
+        scan_markdown_blocks(markdown)
+        timings["scan_markdown_blocks"] += clock() - start
+
+        inline_blocks = [block for block, block_type in zip(blocks, block_types) if block_type != MDBlockType.code]
+        start = clock()
+        for block in inline_blocks:
+            text_to_textnode(block)
+        timings["text_to_textnode"] += clock() - start
+
+        start = clock()
+        html_node = markdown_to_html_node(markdown)
+        timings["markdown_to_html_node"] += clock() - start
+
+        start = clock()
+        html_node.to_html()
+        timings["to_html"] += clock() - start
+
+    return timings
+
+
+def time_end_to_end(content_dir : str, template_path : str, dest_dir : str) -> float:
+    if os.path.exists(dest_dir):
+        shutil.rmtree(dest_dir)
+    os.makedirs(dest_dir)
+
+    # the generator chatter would dominate the measure otherwise
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        start = time.perf_counter()
+        generator.generate_pages_recursive(content_dir, template_path, dest_dir)
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return elapsed
+
+
+def output_bytes(dest_dir : str) -> int:
+    return sum(os.path.getsize(os.path.join(dir_path, file_name)) for dir_path, _, file_names in os.walk(dest_dir) for file_name in file_names)
+
+
+def time_minify(content_dir : str, template_path : str, dest_dir : str, repeat : int) -> dict:
+    """
+    times the build with and without minification, and minify_html run as a separate
+    pass over the outputs for comparison. Returns the seconds and sizes of both builds
+    """
+    plain = min(time_end_to_end(content_dir, template_path, dest_dir) for _ in range(repeat))
+    html_bytes = output_bytes(dest_dir)
+
+    htmls = []
+    for dir_path, _, file_names in os.walk(dest_dir):
+        for file_name in file_names:
+            with open(os.path.join(dir_path, file_name)) as file:
+                htmls.append(file.read())
+    separate_pass = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in htmls:
+            minify.minify_html(html)
+        separate_pass = min(separate_pass, time.perf_counter() - start)
+
+    minify.enable()
+    try:
+        minified = min(time_end_to_end(content_dir, template_path, dest_dir) for _ in range(repeat))
+    finally:
+        minify.disable()
+
+    return {
+        "plain_seconds" : plain,
+        "minified_seconds" : minified,
+        "separate_pass_seconds" : separate_pass,
+        "html_bytes" : html_bytes,
+        "minified_html_bytes" : output_bytes(dest_dir),
+    }
+
+
+class _DictTextNode:
+    # same layout as TextNode before it had __slots__, used as a memory baseline
+    def __init__(self, text : str, text_type : str, url : str = None) -> None:
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class _DictLeafNode:
+    # same layout as LeafNode before it had __slots__, used as a memory baseline
+    def __init__(self, tag : str = None, value : str = None, props : dict = None) -> None:
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+def _traced_bytes(factory, count : int) -> float:
+    """
+    returns the average number of bytes allocated by each of 'count' calls of 'factory'
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # the list holding the objects is not part of the nodes
+    list_bytes = sys.getsizeof(objects)
+    return (after - before - list_bytes) / count
+
+
+def measure_node_memory(count : int = 20000) -> dict:
+    """
+    average bytes per node of the slotted node classes against dict-backed classes
+    with the same attributes. Links to a few repeated urls share their props
+    """
+    urls = [f"/page{i}" for i in range(20)]
+
+    # the strings are built once so that only the nodes are measured
+    texts = [f"text {i}" for i in range(count)]
+
+    return {
+        "TextNode" : {
+            "slots" : _traced_bytes(lambda i: TextNode(texts[i], TextNodeType.text), count),
+            "dict" : _traced_bytes(lambda i: _DictTextNode(texts[i], TextNodeType.text), count),
+        },
+        "LeafNode" : {
+            "slots" : _traced_bytes(lambda i: LeafNode("b", texts[i]), count),
+            "dict" : _traced_bytes(lambda i: _DictLeafNode("b", texts[i]), count),
+        },
+        "link LeafNode" : {
+            "slots" : _traced_bytes(lambda i: text_node_to_html_node(TextNode(texts[i], TextNodeType.link, urls[i % 20])), count),
+            "dict" : _traced_bytes(lambda i: _DictLeafNode("a", texts[i], {"href" : urls[i % 20]}), count),
+        },
+    }
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark(pages : int = 200,
+                  blocks : int = 40,
+                  block_mix : dict = None,
+                  inline_density : float = 0.2,
+                  nesting : int = 2,
+                  seed : int = 0,
+                  repeat : int = 3
+    ) -> dict:
+    """
+    generates a synthetic corpus and times every stage of the pipeline on it, each
+    measure is the best of 'repeat' runs. Returns the report as a json serializable dict
+    """
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = f"{root}/content"
+        template_path = f"{root}/template.html"
+        dest_dir = f"{root}/public"
+
+        paths = generate_corpus(content_dir, pages, blocks, block_mix, inline_density, nesting, seed)
+        with open(template_path, "w") as file:
+            file.write(BENCHMARK_TEMPLATE)
+
+        markdowns = []
+        for path in paths:
+            with open(path) as file:
+                markdowns.append(file.read())
+        corpus_bytes = sum(len(markdown.encode()) for markdown in markdowns)
+
+        stage_runs = [time_stages(markdowns) for _ in range(repeat)]
+        stages = {stage : min(run[stage] for run in stage_runs) for stage in stage_runs[0]}
+        stages["generate_pages_recursive"] = min(time_end_to_end(content_dir, template_path, dest_dir) for _ in range(repeat))
+        minify_timings = time_minify(content_dir, template_path, dest_dir, repeat)
+        stages["generate_pages_minified"] = minify_timings["minified_seconds"]
+
+        # tracemalloc slows everything down, so the peak memory is measured in a separate run
+        tracemalloc.start()
+        time_end_to_end(content_dir, template_path, dest_dir)
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    end_to_end = stages["generate_pages_recursive"]
+
+    return {
+        "config" : {
+            "pages" : pages,
+            "blocks" : blocks,
+            "block_mix" : block_mix or DEFAULT_BLOCK_MIX,
+            "inline_density" : inline_density,
+            "nesting" : nesting,
+            "seed" : seed,
+            "repeat" : repeat,
+        },
+        "environment" : {
+            "python" : platform.python_version(),
+            "implementation" : platform.python_implementation(),
+            "machine" : platform.machine(),
+        },
+        "corpus_bytes" : corpus_bytes,
+        "stages" : {
+            stage : {"seconds" : seconds, "ms_per_page" : seconds * 1000 / pages}
+            for stage, seconds in stages.items()
+        },
+        "pages_per_second" : pages / end_to_end if end_to_end else None,
+        "mb_per_second" : corpus_bytes / end_to_end / 1e6 if end_to_end else None,
+        "minify" : {
+            # extra cost of the minification per MB of generated html, during the serialization and as a separate pass
+            "ms_per_mb" : (minify_timings["minified_seconds"] - minify_timings["plain_seconds"]) * 1000 / (minify_timings["html_bytes"] / 1e6),
+            "separate_pass_ms_per_mb" : minify_timings["separate_pass_seconds"] * 1000 / (minify_timings["html_bytes"] / 1e6),
+            "saved_bytes" : minify_timings["html_bytes"] - minify_timings["minified_html_bytes"],
+        },
+        "peak_traced_bytes" : peak_traced,
+        "peak_rss_bytes" : peak_rss_bytes(),
+        "node_memory" : measure_node_memory(),
+    }
+
+
+def compare_reports(old_report : dict, new_report : dict) -> dict[str, float]:
+    """
+    returns the relative change of every stage timing between two reports,
+    e.g. 0.1 means that the stage got 10% slower
+    """
+    changes = {}
+    for stage, timing in new_report["stages"].items():
+        old_timing = old_report["stages"].get(stage)
+        if old_timing and old_timing["seconds"]:
+            changes[stage] = timing["seconds"] / old_timing["seconds"] - 1
+
+    return changes
+
+
+def print_report(report : dict, changes : dict = None) -> None:
+    config = report["config"]
+    print(f"Corpus: {config['pages']} pages, {config['blocks']} blocks per page, {report['corpus_bytes'] / 1e6:.2f} MB")
+    for stage, timing in report["stages"].items():
+        line = f"  {stage:<26} {timing['seconds'] * 1000:10.2f} ms {timing['ms_per_page']:10.3f} ms/page"
+        if changes and stage in changes:
+            line += f" {changes[stage]:+8.1%}"
+        print(line)
+    print(f"Pages/sec: {report['pages_per_second']:.1f}")
+    minify_report = report["minify"]
+    print(f"Minify: {minify_report['ms_per_mb']:+.2f} ms/MB of html while serializing, "
+          f"{minify_report['separate_pass_ms_per_mb']:.2f} ms/MB as a separate pass, {minify_report['saved_bytes']} bytes saved")
+    print(f"Peak traced memory: {report['peak_traced_bytes'] / 1e6:.2f} MB")
+    if report["peak_rss_bytes"] is not None:
+        print(f"Peak RSS: {report['peak_rss_bytes'] / 1e6:.2f} MB")
+    print("Bytes per node (slots / dict-backed):")
+    for node_type, sizes in report["node_memory"].items():
+        print(f"  {node_type:<14} {sizes['slots']:8.1f} / {sizes['dict']:8.1f} ({1 - sizes['slots'] / sizes['dict']:.0%} saved)")
+
+
+def main(argv : list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the markdown -> html pipeline on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=40, help="blocks per page")
+    parser.add_argument("--inline-density", type=float, default=0.2, help="fraction of words turned into inline elements")
+    parser.add_argument("--nesting", type=int, default=2, help="maximum depth of the content directories")
+    parser.add_argument("--mix", default=None,
+                        help="block mix as type=weight pairs, e.g. paragraph=6,code=1,heading=2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="each timing is the best of this many runs")
+    parser.add_argument("--output", default=None, help="write the json report to this file")
+    parser.add_argument("--compare", default=None, help="json report of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="exit with an error if a stage got slower than this fraction (e.g. 0.1) compared to --compare")
+    args = parser.parse_args(argv)
+
+    block_mix = None
+    if args.mix:
+        block_mix = {}
+        for pair in args.mix.split(","):
+            block_type, weight = pair.split("=")
+            if block_type not in DEFAULT_BLOCK_MIX:
+                raise ValueError(f"Unknown block type '{block_type}' in --mix")
+            block_mix[block_type] = float(weight)
+
+    report = run_benchmark(args.pages, args.blocks, block_mix, args.inline_density, args.nesting, args.seed, args.repeat)
+
+    changes = None
+    if args.compare:
+        with open(args.compare) as file:
+            changes = compare_reports(json.load(file), report)
+
+    print_report(report, changes)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if changes and args.max_regression is not None:
+        regressions = {stage : change for stage, change in changes.items() if change > args.max_regression}
+        if regressions:
+            print(f"Regressions over {args.max_regression:.0%}: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
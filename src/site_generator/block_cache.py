@@ -0,0 +1,149 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+from site_generator import assets
+from site_generator import minify
+
+
+# bump whenever the html produced for a block changes, so that persisted caches are discarded
+BLOCK_CACHE_VERSION = 2
+DEFAULT_BLOCK_CACHE_SIZE = 10000
+
+
+def block_key(block : str) -> str:
+    digest = hashlib.blake2b(block.encode(), digest_size=16)
+    # the html of links and images changes with the fingerprints of the assets
+    fingerprints_digest = assets.fingerprints_digest()
+    if fingerprints_digest:
+        digest.update(fingerprints_digest.encode())
+    if minify.active():
+        digest.update(b"minify")
+
+    return digest.hexdigest()
+
+
+class BlockCache:
+    """
+    content addressed cache mapping the text of a markdown block to its rendered html,
+    with least recently used eviction once 'max_entries' is reached.
+    When 'path' is given the cache is loaded from and saved to that file, so that it
+    survives across builds
+    """
+    def __init__(self, max_entries : int = DEFAULT_BLOCK_CACHE_SIZE, path : str = None) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # only worker processes record the keys added since the last export_state, to send them back
+        # to the main process. Evicted keys are dropped, so that at most 'max_entries' are recorded
+        self.record_new_keys = False
+        self._new_keys = {}
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def get(self, block : str) -> str:
+        key = block_key(block)
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, block : str, html : str) -> None:
+        self._put_key(block_key(block), html)
+
+    def _put_key(self, key : str, html : str) -> None:
+        if self.record_new_keys and key not in self.entries:
+            self._new_keys[key] = None
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            evicted_key, _ = self.entries.popitem(last=False)
+            self._new_keys.pop(evicted_key, None)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries" : len(self.entries),
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "hit_rate" : self.hits / lookups if lookups else 0.0,
+        }
+
+    def export_state(self) -> dict:
+        """
+        returns the statistics and the entries added since the last call, and resets the
+        statistics. Used to send the work of a worker process back to the main one
+        """
+        state = {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "entries" : [(key, self.entries[key]) for key in self._new_keys],
+        }
+        self.hits = self.misses = self.evictions = 0
+        self._new_keys = {}
+
+        return state
+
+    def merge(self, state : dict) -> None:
+        self.hits += state["hits"]
+        self.misses += state["misses"]
+        self.evictions += state["evictions"]
+        for key, html in state["entries"]:
+            self._put_key(key, html)
+
+    def load(self) -> None:
+        with open(self.path) as file:
+            try:
+                data = json.load(file)
+            except json.JSONDecodeError:
+                print(f"Ignoring corrupted block cache '{self.path}'")
+                return
+
+        if data.get("version") != BLOCK_CACHE_VERSION:
+            return
+
+        # entries are stored from the least to the most recently used
+        for key, html in data["entries"][-self.max_entries:]:
+            self.entries[key] = html
+
+    def save(self) -> None:
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version" : BLOCK_CACHE_VERSION, "entries" : list(self.entries.items())}, file)
+        os.replace(tmp_path, self.path)
+
+
+# the cache used by markdown_to_html_node, None when caching is off
+_active = None
+
+
+def enable(max_entries : int = DEFAULT_BLOCK_CACHE_SIZE, path : str = None) -> BlockCache:
+    global _active
+    _active = BlockCache(max_entries, path)
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> BlockCache:
+    return _active
@@ -0,0 +1,113 @@
+import posixpath
+from collections import deque
+
+from site_generator.assets import html_url_pattern
+from site_generator.textnode_utils import iter_markdown_blocks
+from site_generator.htmlnode_utils import block_urls
+from site_generator.front_matter import split_front_matter
+
+
+def local_asset_path(url : str, page_dest : str, dest_root : str, static_dir : str) -> str:
+    """
+    returns the path in 'static_dir' of the file a url points to, None for urls outside
+    the site (other domains, mailto:, anchors...) e.g. for the page 'public/blog/post.html'
+
+    local_asset_path("/images/a.png", "public/blog/post.html", "public", "static") == "static/images/a.png"
+    local_asset_path("b.png", "public/blog/post.html", "public", "static") == "static/blog/b.png"
+    """
+    url = url.split('#', 1)[0].split('?', 1)[0]
+    if not url or "://" in url or url.startswith("//") or ":" in url.split('/', 1)[0]:
+        return None
+
+    if url.startswith('/'):
+        relative_path = posixpath.normpath(url.lstrip('/'))
+    else:
+        page_dir = posixpath.relpath(posixpath.dirname(page_dest), dest_root)
+        relative_path = posixpath.normpath(posixpath.join(page_dir, url))
+
+    # a url going above the root of the site
+    if relative_path.startswith(".."):
+        return None
+
+    return f"{static_dir}/{relative_path}"
+
+
+def _local_asset_paths(urls : list[str], page_dest : str, dest_root : str, static_dir : str) -> list[str]:
+    paths = set()
+    for url in urls:
+        path = local_asset_path(url, page_dest, dest_root, static_dir)
+        # the root of the site is not an asset
+        if path is not None and not path.endswith("/."):
+            paths.add(path)
+
+    return sorted(paths)
+
+
+def find_image_dependencies(markdown : str, page_dest : str, dest_root : str, static_dir : str, links : bool = False) -> list[str]:
+    """
+    returns the sorted paths of the static files linked as images by the page,
+    with 'links' the static files linked by its links are included too
+    """
+    _, body, first_line = split_front_matter(markdown)
+    # the urls are found by the scanner rendering the page, so that they match the html
+    urls = []
+    for block in iter_markdown_blocks(body.split('\n'), first_line):
+        urls += [url for url, _, kind in block_urls(block) if links or kind == "image"]
+
+    return _local_asset_paths(urls, page_dest, dest_root, static_dir)
+
+
+def find_html_dependencies(html : str, page_dest : str, dest_root : str, static_dir : str) -> list[str]:
+    """
+    returns the sorted paths of the static files referenced by the href and src attributes of 'html' (e.g. a template)
+    """
+    return _local_asset_paths([match.group(2) for match in html_url_pattern.finditer(html)], page_dest, dest_root, static_dir)
+
+
+class DependencyGraph:
+    """
+    what every output was built from: each node (e.g. a page) lists the inputs it depends
+    on (its template, the images it links, ...). An input can be a node itself, so that
+    a change travels to the dependents of its dependents e.g.
+
+    graph = DependencyGraph({
+        "content/index.md" : ["template.html", "content/blog/post.md"],
+        "content/blog/post.md" : ["template.html", "static/images/a.png"],
+    })
+
+    graph.invalidated({"static/images/a.png" : "changed"}) == {
+        "content/blog/post.md" : "'static/images/a.png' changed",
+        "content/index.md" : "'content/blog/post.md' is rebuilt ('static/images/a.png' changed)",
+    }
+    """
+    def __init__(self, edges : dict[str, list[str]] = None) -> None:
+        self.edges = edges if edges is not None else {}
+
+    def dependents(self) -> dict[str, list[str]]:
+        reverse_edges = {}
+        for node, inputs in self.edges.items():
+            for input_path in inputs:
+                reverse_edges.setdefault(input_path, []).append(node)
+
+        return reverse_edges
+
+    def invalidated(self, changed : dict[str, str]) -> dict[str, str]:
+        """
+        given the changed inputs (path -> why), returns every node depending on them,
+        directly or not, with the reason it must be rebuilt
+        """
+        reverse_edges = self.dependents()
+        reasons = {}
+        queue = deque(changed.items())
+        while queue:
+            input_path, why = queue.popleft()
+            for node in reverse_edges.get(input_path, []):
+                if node in reasons:
+                    continue
+                if input_path in changed:
+                    reasons[node] = f"'{input_path}' {why}"
+                else:
+                    reasons[node] = f"'{input_path}' is rebuilt ({why})"
+                queue.append((node, reasons[node]))
+
+        return reasons
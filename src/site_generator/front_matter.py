@@ -0,0 +1,100 @@
+from typing import Iterable
+import itertools
+
+
+# opening/closing line of the front matter -> separator between keys and values
+FRONT_MATTER_DELIMITERS = {
+    "---" : ":",  # yaml style, title: Home
+    "+++" : "=",  # toml style, title = "Home"
+}
+
+# the pre-scan never reads more than this from a page
+FRONT_MATTER_MAX_CHARS = 64 * 1024
+
+
+def parse_front_matter(lines : list[str], separator : str) -> dict:
+    """
+    parses flat 'key: value' (or 'key = value') lines, quotes around the values are removed e.g.
+
+    parse_front_matter(['title: "Home"', 'date: 2024-05-01'], ":") == {"title" : "Home", "date" : "2024-05-01"}
+
+    blank lines and # comments are skipped
+    """
+    metadata = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        key, found, value = line.partition(separator)
+        key = key.strip()
+        if not found or not key:
+            raise Exception(f"Invalid front matter line: '{line}'")
+
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        metadata[key] = value
+
+    return metadata
+
+
+def split_front_matter_lines(lines : Iterable[str]) -> tuple[dict, Iterable[str], int]:
+    """
+    reads the front matter at the top of 'lines' (e.g. an open markdown file) and returns
+    the metadata, the remaining lines and the line number the remaining lines start at.
+    Only the front matter is consumed, the body is left to be read by the caller.
+    Lines without a front matter, or with an opening delimiter never closed, are returned as they are
+    """
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return {}, [], 1
+
+    delimiter = first_line.strip()
+    if delimiter not in FRONT_MATTER_DELIMITERS:
+        return {}, itertools.chain([first_line], lines), 1
+
+    front_matter_lines = []
+    for line in lines:
+        if line.strip() == delimiter:
+            metadata = parse_front_matter(front_matter_lines, FRONT_MATTER_DELIMITERS[delimiter])
+            return metadata, lines, len(front_matter_lines) + 3
+        front_matter_lines.append(line)
+
+    # not a front matter after all
+    return {}, itertools.chain([first_line], front_matter_lines), 1
+
+
+def split_front_matter(markdown : str) -> tuple[dict, str, int]:
+    """
+    returns the metadata of 'markdown', its body and the line number the body starts at e.g.
+
+    split_front_matter("---\ntitle: Home\n---\n# Home") == ({"title" : "Home"}, "# Home", 4)
+    """
+    if not markdown.startswith(tuple(FRONT_MATTER_DELIMITERS)):
+        return {}, markdown, 1
+
+    metadata, lines, first_line = split_front_matter_lines(markdown.split('\n'))
+    if first_line == 1:
+        return {}, markdown, 1
+
+    return metadata, '\n'.join(lines), first_line
+
+
+def read_front_matter(path : str, max_chars : int = FRONT_MATTER_MAX_CHARS) -> dict:
+    """
+    returns the metadata of the markdown file at 'path' reading at most 'max_chars'
+    characters of it and without parsing the body, to list or index many pages cheaply
+    """
+    with open(path) as file:
+        head = file.read(max_chars)
+
+    if not head.startswith(tuple(FRONT_MATTER_DELIMITERS)):
+        return {}
+
+    metadata, lines, first_line = split_front_matter_lines(head.split('\n'))
+    if first_line == 1 and len(head) == max_chars:
+        raise Exception(f"Front matter of '{path}' not closed within its first {max_chars} characters")
+
+    return metadata
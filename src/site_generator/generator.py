@@ -1,22 +1,66 @@
-import re
 import os
+import io
 import shutil
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from site_generator.textnode_utils import *
 from site_generator.htmlnode_utils import *
+from site_generator.manifest import BuildManifest, hash_file, DEPENDENCIES_CHANGED
+from site_generator.dependencies import find_image_dependencies, find_html_dependencies
+from site_generator import assets
+from site_generator import precompress
+from site_generator import minify
+from site_generator.template import Template, load_template
+from site_generator.front_matter import split_front_matter, split_front_matter_lines, read_front_matter
+from site_generator.assets import transfer_file, replace_if_changed, write_if_changed
+from site_generator import profiling
+from site_generator import block_cache
+from site_generator import parse_cache
 
 
-def copy_static_contents(dir1 : str, dir2 : str) -> None:
+# markdown files bigger than this (in bytes) are converted and written block by block
+STREAM_THRESHOLD = 4 * 1024 * 1024
 
+# pages read, rendered or written at the same time by generate_pages_async
+DEFAULT_IO_LIMIT = 16
+
+
+def erase_contents(dir_path : str, keep : set[str]) -> None:
+    """
+    removes everything in 'dir_path' but the files in 'keep' (and the directories holding them)
+    """
+    for dir_path, dir_names, file_names in os.walk(dir_path, topdown=False):
+        for file_name in file_names:
+            path = os.path.normpath(f"{dir_path}/{file_name}")
+            if path not in keep:
+                os.remove(path)
+        for dir_name in dir_names:
+            path = f"{dir_path}/{dir_name}"
+            if os.path.islink(path):
+                os.remove(path)
+            elif not os.listdir(path):
+                os.rmdir(path)
+
+
+def copy_static_contents(dir1 : str, dir2 : str, keep : set[str] = None) -> None:
+    """
+    copies 'dir1' into a fresh 'dir2'. The files of 'keep' (normalized paths, e.g. the
+    pages about to be generated again) are left in place, so that a page rendered to
+    the same html is not rewritten and keeps its modification time
+    """
     if not os.path.exists(dir1):
         raise Exception("Static contents directory not found")
 
     if os.path.exists(dir2):
         print(f"Erasing old contents from '{dir2}' directory")
-        shutil.rmtree(dir2)
+        if keep is None:
+            shutil.rmtree(dir2)
+        else:
+            erase_contents(dir2, keep)
 
     print(f"Creating new '{dir2}' directory")
-    os.mkdir(dir2)
+    os.makedirs(dir2, exist_ok=True)
 
     if os.path.exists(dir1):
 
@@ -25,12 +69,14 @@ def copy_static_contents(dir1 : str, dir2 : str) -> None:
         for elem in dir1_contents:
             if os.path.isfile(f"{dir1}/{elem}"):
                 print(f"Copying of '{dir1}/{elem}' to '{dir2}/{elem}'")
-                shutil.copy(f"{dir1}/{elem}", f"{dir2}/{elem}")
+                with profiling.stage("static"):
+                    shutil.copy(f"{dir1}/{elem}", f"{dir2}/{elem}")
+                profiling.count_file("static_bytes_copied", f"{dir2}/{elem}")
             else:
                 print(f"Creating directory '{dir2}/{elem}'")
-                os.mkdir(f"{dir2}/{elem}")
+                os.makedirs(f"{dir2}/{elem}", exist_ok=True)
                 print(f"Transferring files from '{dir1}/{elem}' to '{dir2}/{elem}'")
-                copy_static_contents(f"{dir1}/{elem}", f"{dir2}/{elem}")
+                copy_static_contents(f"{dir1}/{elem}", f"{dir2}/{elem}", keep)
     else:
         shutil.copy(f"{dir1}", f"{dir2}")
 
@@ -38,40 +84,165 @@ def copy_static_contents(dir1 : str, dir2 : str) -> None:
 
 def extract_single_header(markdown : str) -> str:
     
-    markdown_blocks = markdown_to_blocks(markdown)
+    # pages being rendered get their title from markdown_to_document instead
+    _, body, first_line = split_front_matter(markdown)
+    headings = [block_heading(block) for block in scan_markdown_blocks(body, first_line)]
+
+    return MarkdownDocument(None, [heading for heading in headings if heading is not None]).title
+
+
+def page_values(metadata : dict, page_title : str, content) -> dict:
+    """
+    values of the template placeholders for a page: its front matter keys plus
+    'Title' and 'Content', which cannot be overridden by the front matter
+    """
+    values = dict(metadata)
+    values["Title"] = page_title
+    values["Content"] = content
+
+    return values
+
+
+def load_page_template(template_path : str) -> Template:
+    # the asset urls of the template are fingerprinted and its html minified once per build
+    return minify.minified_template(assets.fingerprinted_template(load_template(template_path)))
+
+
+def parse_page(markdown : str) -> tuple[dict, MarkdownDocument]:
+    """
+    returns the front matter and the parsed document of a page, taken from the
+    parse cache when it is on and the same markdown was already parsed
+    """
+    cache = parse_cache.active()
+    if cache is not None:
+        cached = cache.get(markdown)
+        if cached is not None:
+            metadata, headings, html = cached
+            return metadata, MarkdownDocument(LeafNode(None, html), headings)
+
+    metadata, body, first_line = split_front_matter(markdown)
+    document = markdown_to_document(body, first_line)
+
+    if cache is not None:
+        # the tree is serialized once, for both the cache and the page
+        html = document.html_node.to_html()
+        cache.put(markdown, metadata, document.headings, html)
+        document.html_node = LeafNode(None, html)
+
+    return metadata, document
+
+
+def generate_page(from_path : str, template_path : str, dest_path : str, stream_threshold : int = STREAM_THRESHOLD) -> bool:
+    """
+    renders the page at 'from_path' to 'dest_path', which is replaced atomically and only
+    if its content changed (see replace_if_changed). Returns whether 'dest_path' changed
+    """
+    # big pages are never loaded in memory as a whole
+    if stream_threshold is not None and os.path.getsize(from_path) > stream_threshold:
+        return generate_page_streaming(from_path, template_path, dest_path)
+
+    with profiling.stage("page", from_path):
+        with profiling.stage("read"):
+            with open(from_path) as md_file:
+                markdown = md_file.read()
 
-    # regex to match a single # header
-    header_pattern = re.compile(r'^# (.*)$')
+            # compiled once per build and reused by every page
+            template = load_page_template(template_path)
+        profiling.count_file("bytes_read", from_path)
 
-    headers = [header_pattern.match(block).group(1) for block in markdown_blocks if header_pattern.match(block)]
+        # the title is collected while parsing, the markdown is scanned only once
+        with profiling.stage("parse"):
+            metadata, document = parse_page(markdown)
+            page_title = document.title
 
-    if len(headers) != 1:
-        raise Exception("There must be exactly one single # header")
+        dest_path = dest_path.replace('.md', '.html')
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
 
-    return headers[0]
+        # the tree is streamed into the file, so serialization and writing are timed together
+        tmp_path = f"{dest_path}.tmp"
+        with profiling.stage("serialize"):
+            try:
+                with open(tmp_path, "w") as file:
+                    template.write(file, page_values(metadata, page_title, document.html_node))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            changed = replace_if_changed(tmp_path, dest_path)
+        profiling.count_file("bytes_written", dest_path)
+        profiling.count("pages", 1)
+        profiling.count("changed_pages", int(changed))
 
+    return changed
 
-def generate_page(from_path : str, template_path : str, dest_path : str) -> None:    
 
+def read_page_header(from_path : str) -> tuple[dict, str]:
+    """
+    returns the front matter and the title of the markdown file at 'from_path',
+    reading its blocks only up to the first single # header
+    """
     with open(from_path) as md_file:
-        markdown = md_file.read()
+        metadata, lines, first_line = split_front_matter_lines(md_file)
+        for block in iter_markdown_blocks(lines, first_line):
+            heading = block_heading(block)
+            if heading is not None and heading[0] == 1 and '\n' not in heading[1]:
+                return metadata, heading[1]
 
-    with open(template_path) as template_file:
-        template = template_file.read()
+    raise Exception("There must be exactly one single # header")
 
-    html_node = markdown_to_html_node(markdown)
-    contents = html_node.to_html()
-    page_title = extract_single_header(markdown)
 
-    template = template.replace("{{ Content }}", contents)
-    template = template.replace("{{ Title }}", page_title)
+def generate_page_streaming(from_path : str, template_path : str, dest_path : str) -> bool:
+    """
+    same output as generate_page, but the markdown is read, converted and written one
+    block at a time so that memory stays flat whatever the size of the page.
+    The title is found by reading the file only up to its first # header, the headers
+    are then counted while streaming: the page is written to a temporary file that
+    replaces 'dest_path' only once the whole page is known to be valid, and only if
+    its content changed. Returns whether 'dest_path' changed
+    """
+    with profiling.stage("page", from_path):
+        with profiling.stage("title"):
+            metadata, page_title = read_page_header(from_path)
+            template = load_page_template(template_path)
 
-    dest_path = dest_path.replace('.md', '.html')
-    with open(dest_path, "w") as file:
-        file.write(template)
+        dest_path = dest_path.replace('.md', '.html')
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
 
+        # parsing, serialization and writing are interleaved, so they are timed together
+        tmp_path = f"{dest_path}.tmp"
+        with profiling.stage("stream"):
+            try:
+                with open(from_path) as md_file, open(tmp_path, "w") as file:
+                    # the front matter was already read by read_page_header
+                    _, lines, first_line = split_front_matter_lines(md_file)
+                    content = StreamedMarkdown(lines, first_line)
+                    template.write(file, page_values(metadata, page_title, content))
 
-def generate_pages_recursive(dir_path_content : str, template_path : str, dest_dir_path : str) -> None:
+                if len(content.titles) != 1:
+                    raise Exception("There must be exactly one single # header")
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            changed = replace_if_changed(tmp_path, dest_path)
+
+        profiling.count_file("bytes_read", from_path)
+        profiling.count_file("bytes_written", dest_path)
+        profiling.count("pages", 1)
+        profiling.count("streamed_pages", 1)
+        profiling.count("changed_pages", int(changed))
+
+    return changed
+
+
+def generate_pages_recursive(dir_path_content : str, template_path : str, dest_dir_path : str, stream_threshold : int = STREAM_THRESHOLD) -> int:
+    """
+    renders every page of 'dir_path_content' into 'dest_dir_path', returns the number of outputs whose content changed
+    """
 
     if not os.path.exists(dir_path_content):
         raise Exception("content directory not found")
@@ -82,17 +253,519 @@ def generate_pages_recursive(dir_path_content : str, template_path : str, dest_d
     print()
     print(f"Generating page from {dir_path_content} to {dest_dir_path} using {template_path}\n")
 
+    changed = 0
     if not os.path.isfile(dir_path_content):
 
         contents = os.listdir(dir_path_content)
         for elem in contents:
             if os.path.isfile(f"{dir_path_content}/{elem}") and f"{dir_path_content}/{elem}".endswith('.md'):
-                generate_page(f"{dir_path_content}/{elem}", template_path, f"{dest_dir_path}/{elem}")
+                changed += generate_page(f"{dir_path_content}/{elem}", template_path, f"{dest_dir_path}/{elem}", stream_threshold)
             else:
-                os.mkdir(f"{dest_dir_path}/{elem}")
-                generate_pages_recursive(f"{dir_path_content}/{elem}", template_path, f"{dest_dir_path}/{elem}")
+                os.makedirs(f"{dest_dir_path}/{elem}", exist_ok=True)
+                changed += generate_pages_recursive(f"{dir_path_content}/{elem}", template_path, f"{dest_dir_path}/{elem}", stream_threshold)
+    else:
+        changed += generate_page(dir_path_content, template_path, dest_dir_path, stream_threshold)
+
+    return changed
+
+
+def find_files(dir1 : str, dir2 : str, extension : str = None) -> list[tuple[str, str]]:
+    """
+    walks 'dir1' and returns the sorted (source, destination) path pairs of every file in it,
+    the destination being the same relative path under 'dir2' e.g.
+
+    find_files("content", "public", ".md") == [
+                                                ("content/index.md", "public/index.md"),
+                                                ("content/majesty/index.md", "public/majesty/index.md"),
+                                            ]
+    """
+    pairs = []
+    for elem in sorted(os.listdir(dir1)):
+        if os.path.isfile(f"{dir1}/{elem}"):
+            if extension is None or elem.endswith(extension):
+                pairs.append((f"{dir1}/{elem}", f"{dir2}/{elem}"))
+        else:
+            pairs.extend(find_files(f"{dir1}/{elem}", f"{dir2}/{elem}", extension))
+
+    return pairs
+
+
+def page_outputs(dir_path_content : str, dest_dir_path : str) -> set[str]:
+    """
+    returns the normalized paths of the html pages generated from 'dir_path_content'
+    """
+    if not os.path.isdir(dir_path_content):
+        return set()
+
+    return {os.path.normpath(dest_path.replace('.md', '.html')) for _, dest_path in find_files(dir_path_content, dest_dir_path, ".md")}
+
+
+def read_site_metadata(dir_path_content : str) -> list[tuple[str, dict]]:
+    """
+    returns the (source path, front matter) pairs of every page in 'dir_path_content',
+    reading only the top of each file: meant to build navigation, sitemaps or listing
+    pages without rendering the pages first
+    """
+    return [(from_path, read_front_matter(from_path)) for from_path, _ in find_files(dir_path_content, dir_path_content, ".md")]
+
+
+def remove_stale_output(dest_path : str, dest_root : str) -> None:
+    """
+    removes an output whose source no longer exists, together with
+    the directories left empty by the removal (up to 'dest_root')
+    """
+    if os.path.exists(dest_path):
+        print(f"Removing stale output '{dest_path}'")
+        os.remove(dest_path)
+
+    dest_root = os.path.abspath(dest_root)
+    parent = os.path.dirname(os.path.abspath(dest_path))
+    while parent != dest_root and parent.startswith(dest_root) and os.path.isdir(parent) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+def sync_static_contents(dir1 : str, dir2 : str, manifest : BuildManifest, check_hash : bool = False, link : bool = False) -> int:
+    """
+    incremental version of copy_static_contents: copies only the files whose size or
+    modification time changed since the last build and removes the outputs of deleted
+    files, without ever erasing 'dir2' (so the generated pages survive).
+
+    With 'check_hash' a file whose size or mtime changed is copied only if its content
+    hash changed too, with 'link' files are hardlinked instead of copied where possible.
+    Returns the number of copied files
+    """
+    if not os.path.exists(dir1):
+        raise Exception("Static contents directory not found")
+
+    copied = 0
+    seen = set()
+    for from_path, dest_path in find_files(dir1, dir2):
+        seen.add(from_path)
+        stat = os.stat(from_path)
+        entry = manifest.static.get(from_path)
+        file_hash = entry.get("hash") if entry else None
+
+        if manifest.static_is_stale(from_path, dest_path, stat):
+            same_content = False
+            if check_hash:
+                new_hash = hash_file(from_path)
+                same_content = (new_hash == file_hash and os.path.exists(dest_path)
+                                and os.path.getsize(dest_path) == stat.st_size)
+                file_hash = new_hash
+
+            if not same_content:
+                with profiling.stage("static"):
+                    method = transfer_file(from_path, dest_path, link)
+                profiling.count("static_bytes_copied", stat.st_size)
+                print(f"Copying of '{from_path}' to '{dest_path}' ({method})")
+                copied += 1
+
+        manifest.static[from_path] = {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : file_hash, "dest" : dest_path}
+
+    for from_path in [path for path in manifest.static if path not in seen]:
+        remove_stale_output(manifest.static.pop(from_path)["dest"], dir2)
+
+    return copied
+
+
+def fingerprint_static_contents(dir1 : str, dir2 : str, manifest : BuildManifest) -> dict[str, str]:
+    """
+    puts next to every static file copied in 'dir2' an immutable copy named after its
+    content hash (index.css -> index.3f9a1c07be.css), to be cached forever by browsers
+    and CDNs, and writes the asset manifest mapping the url of every asset to the url of
+    its copy. Only the files whose size or modification time changed are hashed again.
+    Returns the url mapping, to be passed to assets.enable_fingerprints
+    """
+    urls = {}
+    seen = set()
+    for from_path, dest_path in find_files(dir1, dir2):
+        seen.add(from_path)
+        stat = os.stat(from_path)
+        entry = manifest.fingerprints.get(from_path)
+
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            file_hash = entry["hash"]
+        else:
+            file_hash = hash_file(from_path)
+
+        relative_path = os.path.relpath(from_path, dir1).replace(os.sep, '/')
+        hashed_path = assets.fingerprinted_name(relative_path, file_hash)
+        hashed_dest = f"{dir2}/{hashed_path}"
+
+        if entry is not None and entry["dest"] != hashed_dest:
+            remove_stale_output(entry["dest"], dir2)
+        if not os.path.exists(hashed_dest):
+            # the copy in 'dir2' is linked rather than the source, which could be edited in place
+            transfer_file(dest_path if os.path.exists(dest_path) else from_path, hashed_dest, link=True)
+
+        manifest.fingerprints[from_path] = {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : file_hash, "dest" : hashed_dest}
+        urls[f"/{relative_path}"] = f"/{hashed_path}"
+
+    for from_path in [path for path in manifest.fingerprints if path not in seen]:
+        remove_stale_output(manifest.fingerprints.pop(from_path)["dest"], dir2)
+
+    assets.write_asset_manifest(dir2, urls)
+
+    return urls
+
+
+def compress_outputs(dest_dir : str, manifest : BuildManifest, codecs : list[str], min_size : int = precompress.DEFAULT_MIN_SIZE, jobs : int = 1) -> int:
+    """
+    post-write stage writing the precompressed siblings of the pages and static files in
+    'dest_dir' (index.html.gz, index.css.br...), for servers serving them as they are
+    (e.g. nginx gzip_static). Files whose content did not change since the last build are
+    skipped, the compression is spread over 'jobs' processes.
+    Returns the number of files whose siblings were written again
+    """
+    compress_jobs = [(path, codecs, min_size, manifest.compressed.get(path)) for path in precompress.find_compressible_files(dest_dir)]
+
+    written = 0
+    # the siblings are not compressible files themselves, so they are never compressed again
+    with profiling.stage("compress"):
+        if jobs > 1 and len(compress_jobs) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(precompress._compress_job, compress_jobs, chunksize=max(1, len(compress_jobs) // (jobs * 4))))
+        else:
+            results = [precompress._compress_job(job) for job in compress_jobs]
+
+    seen = set()
+    for (path, _, _, _), (entry, file_written) in zip(compress_jobs, results):
+        seen.add(path)
+        manifest.compressed[path] = entry
+        written += file_written
+
+    # the outputs removed since the last build
+    for path in [path for path in manifest.compressed if path not in seen]:
+        precompress.remove_compressed(path, manifest.compressed.pop(path)["codecs"])
+
+    profiling.count("compressed_files", written)
+
+    return written
+
+
+def _init_worker(profile : bool, trace : bool, cache_settings : tuple[int, str], parse_cache_settings : tuple[str, int], fingerprints : dict[str, str],
+                 minified : bool) -> None:
+    # forked workers inherit the profiler of the main process, they must start from a clean one
+    if profile:
+        profiling.enable(trace)
+    else:
+        profiling.disable()
+
+    if cache_settings is None:
+        block_cache.disable()
+    elif block_cache.active() is None:
+        block_cache.enable(*cache_settings)
+    else:
+        # inherited from the main process: the entries are reused, the statistics start over
+        block_cache.active().export_state()
+    if cache_settings is not None:
+        block_cache.active().record_new_keys = True
+
+    if parse_cache_settings is None:
+        parse_cache.disable()
+    else:
+        parse_cache.enable(*parse_cache_settings)
+
+    if fingerprints is None:
+        assets.disable_fingerprints()
+    else:
+        assets.enable_fingerprints(fingerprints)
+
+    if minified:
+        minify.enable()
+    else:
+        minify.disable()
+
+
+def _worker_initargs() -> tuple:
+    # the workers profile and cache like the main process
+    profiler = profiling.active()
+    cache = block_cache.active()
+    page_cache = parse_cache.active()
+    return (
+        profiler is not None,
+        profiler is not None and profiler.trace,
+        (cache.max_entries, cache.path) if cache is not None else None,
+        (page_cache.path, page_cache.max_bytes) if page_cache is not None else None,
+        assets.fingerprints(),
+        minify.active(),
+    )
+
+
+def _export_worker_state() -> dict:
+    profiler = profiling.active()
+    cache = block_cache.active()
+    page_cache = parse_cache.active()
+    return {
+        "profile" : profiler.export_state() if profiler is not None else None,
+        "block_cache" : cache.export_state() if cache is not None else None,
+        "parse_cache" : page_cache.export_state() if page_cache is not None else None,
+    }
+
+
+def _merge_worker_state(state : dict) -> None:
+    if state["profile"] is not None:
+        profiling.active().merge(state["profile"])
+    if state["block_cache"] is not None:
+        block_cache.active().merge(state["block_cache"])
+    if state["parse_cache"] is not None:
+        parse_cache.active().merge(state["parse_cache"])
+
+
+def _generate_page_job(job : tuple[str, str, str, int]) -> tuple[str, bool, dict]:
+    from_path, template_path, dest_path, stream_threshold = job
+    try:
+        changed = generate_page(from_path, template_path, dest_path, stream_threshold)
+    except Exception as e:
+        # exceptions raised in a worker process lose their context, so the failing page is named explicitly
+        raise Exception(f"Failed to generate page from '{from_path}': {e}") from e
+
+    return dest_path, changed, _export_worker_state()
+
+
+def report_changed_pages(changed : int, rendered : int) -> None:
+    # outputs rendered to the same content are not rewritten, so only these ones get a new modification time
+    print(f"{changed} of {rendered} rendered pages changed")
+
+
+def generate_pages(pages : list[tuple[str, str]], template_path : str, jobs : int = 1, stream_threshold : int = STREAM_THRESHOLD, io_limit : int = None) -> int:
+    """
+    renders the given (source, destination) pairs, fanning the work out to 'jobs' processes
+    in chunks when jobs > 1. Every page is written to its own destination so the output does
+    not depend on the scheduling. Pages bigger than 'stream_threshold' bytes are streamed.
+    With 'io_limit' the pages go through the asynchronous pipeline of generate_pages_async.
+    The number of outputs whose content actually changed is printed.
+    Returns the number of rendered pages
+    """
+    if io_limit is not None:
+        return generate_pages_async(pages, template_path, jobs, io_limit, stream_threshold)
+
+    changed = 0
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, dest_path in pages:
+            try:
+                changed += generate_page(from_path, template_path, dest_path, stream_threshold)
+            except Exception as e:
+                raise Exception(f"Failed to generate page from '{from_path}': {e}") from e
+        report_changed_pages(changed, len(pages))
+        return len(pages)
+
+    page_jobs = [(from_path, template_path, dest_path, stream_threshold) for from_path, dest_path in pages]
+    initargs = _worker_initargs()
+
+    # a few chunks per worker keep the load balanced without paying the IPC cost for every single page
+    chunksize = max(1, len(page_jobs) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+        for dest_path, page_changed, worker_state in executor.map(_generate_page_job, page_jobs, chunksize=chunksize):
+            _merge_worker_state(worker_state)
+            print(f"Generated page '{dest_path}'" if page_changed else f"Unchanged page '{dest_path}'")
+            changed += page_changed
+
+    report_changed_pages(changed, len(page_jobs))
+    return len(page_jobs)
+
+
+def render_page(from_path : str, markdown : str, template : Template) -> str:
+    """
+    same as generate_page, but on a markdown already read and returning the html of the page
+    instead of writing it, so that the I/O can be done elsewhere
+    """
+    with profiling.stage("page", from_path):
+        with profiling.stage("parse"):
+            metadata, document = parse_page(markdown)
+            page_title = document.title
+
+        with profiling.stage("serialize"):
+            buffer = io.StringIO()
+            template.write(buffer, page_values(metadata, page_title, document.html_node))
+
+    return buffer.getvalue()
+
+
+def _render_page_job(from_path : str, markdown : str, template : Template) -> tuple[str, dict]:
+    return render_page(from_path, markdown, template), _export_worker_state()
+
+
+def _read_text(path : str) -> str:
+    with open(path) as file:
+        return file.read()
+
+
+def _write_text(path : str, text : str) -> tuple[int, bool]:
+    changed = write_if_changed(path, text)
+
+    return os.path.getsize(path), changed
+
+
+async def _generate_pages_pipeline(pages : list[tuple[str, str]], template_path : str, jobs : int, io_limit : int, stream_threshold : int) -> int:
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(io_limit)
+    template = await asyncio.to_thread(load_page_template, template_path)
+
+    # the rendering is done off the event loop, by processes when jobs > 1 so that it runs in parallel
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=_worker_initargs())
     else:
-        generate_page(dir_path_content, template_path, dest_dir_path)
+        executor = ThreadPoolExecutor(max_workers=1)
 
+    async def build_page(from_path : str, dest_path : str) -> bool:
+        dest_path = dest_path.replace('.md', '.html')
+        async with in_flight:
+            try:
+                size = await asyncio.to_thread(os.path.getsize, from_path)
 
+                # big pages are streamed by the worker itself, never loaded in memory
+                if stream_threshold is not None and size > stream_threshold:
+                    if jobs > 1:
+                        _, changed, worker_state = await loop.run_in_executor(executor, _generate_page_job, (from_path, template_path, dest_path, stream_threshold))
+                        _merge_worker_state(worker_state)
+                    else:
+                        changed = await loop.run_in_executor(executor, generate_page_streaming, from_path, template_path, dest_path)
+                else:
+                    markdown = await asyncio.to_thread(_read_text, from_path)
+                    profiling.count("bytes_read", size)
+
+                    if jobs > 1:
+                        html, worker_state = await loop.run_in_executor(executor, _render_page_job, from_path, markdown, template)
+                        _merge_worker_state(worker_state)
+                    else:
+                        html = await loop.run_in_executor(executor, render_page, from_path, markdown, template)
+
+                    written, changed = await asyncio.to_thread(_write_text, dest_path, html)
+                    profiling.count("bytes_written", written)
+                    profiling.count("pages", 1)
+                    profiling.count("changed_pages", int(changed))
+            except Exception as e:
+                raise Exception(f"Failed to generate page from '{from_path}': {e}") from e
+
+        print(f"Generated page '{dest_path}'" if changed else f"Unchanged page '{dest_path}'")
+        return changed
+
+    with executor:
+        changed_pages = await asyncio.gather(*[build_page(from_path, dest_path) for from_path, dest_path in pages])
+
+    return sum(changed_pages)
+
+
+def generate_pages_async(pages : list[tuple[str, str]],
+                         template_path : str,
+                         jobs : int = 1,
+                         io_limit : int = DEFAULT_IO_LIMIT,
+                         stream_threshold : int = STREAM_THRESHOLD
+    ) -> int:
+    """
+    renders the given (source, destination) pairs overlapping the I/O with the rendering:
+    up to 'io_limit' pages at a time are read, handed to the rendering worker(s) and
+    written concurrently, so that slow storage (e.g. NFS) does not serialize the build.
+    Same output as generate_pages, returns the number of rendered pages
+    """
+    changed = asyncio.run(_generate_pages_pipeline(pages, template_path, jobs, io_limit, stream_threshold))
+    report_changed_pages(changed, len(pages))
+
+    return len(pages)
+
+
+def generate_pages_parallel(dir_path_content : str, template_path : str, dest_dir_path : str, jobs : int, stream_threshold : int = STREAM_THRESHOLD, io_limit : int = None) -> int:
+    """
+    same output as generate_pages_recursive, but all the pages are discovered first
+    and then rendered by a pool of 'jobs' processes
+    """
+    if not os.path.exists(dir_path_content):
+        raise Exception("content directory not found")
+
+    if not os.path.exists(template_path):
+        raise Exception("html template file not found")
+
+    print(f"Generating pages from {dir_path_content} to {dest_dir_path} using {template_path} with {jobs} jobs\n")
+
+    pages = [(from_path, dest_path.replace('.md', '.html')) for from_path, dest_path in find_files(dir_path_content, dest_dir_path, ".md")]
+
+    return generate_pages(pages, template_path, jobs, stream_threshold, io_limit)
+
+
+def generate_pages_incremental(dir_path_content : str,
+                               template_path : str,
+                               dest_dir_path : str,
+                               manifest : BuildManifest,
+                               jobs : int = 1,
+                               stream_threshold : int = STREAM_THRESHOLD,
+                               static_dir : str = None,
+                               explain : bool = False,
+                               io_limit : int = None
+    ) -> int:
+    """
+    incremental version of generate_pages_recursive: renders only the pages whose markdown
+    or output changed since the last build, plus the pages depending (even indirectly) on a
+    changed input, and removes the outputs of deleted pages. A page depends on its template
+    and, when 'static_dir' is given, on the static files it links as images.
+    With 'explain' the reason every page is rebuilt for is printed.
+    Returns the number of rendered pages
+    """
+    if not os.path.exists(dir_path_content):
+        raise Exception("content directory not found")
+
+    if not os.path.exists(template_path):
+        raise Exception("html template file not found")
+
+    # with fingerprinting the urls of the assets change with their content, so pages also depend
+    # on the assets referenced by the template
+    fingerprints = assets.fingerprints() is not None and static_dir is not None
+    template_html = "".join(load_template(template_path).segments[::2])
+
+    reasons = {}
+    seen = set()
+    for from_path, dest_path in find_files(dir_path_content, dest_dir_path, ".md"):
+        seen.add(from_path)
+        dest_path = dest_path.replace('.md', '.html')
+        page_hash = hash_file(from_path)
+        entry = manifest.pages.get(from_path)
+
+        # the links of a page can only change with its markdown
+        if entry is not None and entry["hash"] == page_hash and entry["fingerprints"] == fingerprints:
+            page_assets = entry["assets"]
+        else:
+            page_assets = []
+            if static_dir is not None:
+                with open(from_path) as md_file:
+                    # fingerprinted urls change with the content of any linked asset, not only images
+                    page_assets = find_image_dependencies(md_file.read(), dest_path, dest_dir_path, static_dir, links=fingerprints)
+
+        dependencies = [template_path]
+        if fingerprints:
+            dependencies += find_html_dependencies(template_html, dest_path, dest_dir_path, static_dir)
+        dependencies += [path for path in page_assets if path not in dependencies]
+
+        reason = manifest.page_stale_reason(from_path, page_hash, dest_path, dependencies, fingerprints, minify.active())
+        if reason is not None:
+            reasons[from_path] = reason
+
+        manifest.pages[from_path] = {"hash" : page_hash, "dest" : dest_path, "assets" : page_assets, "fingerprints" : fingerprints,
+                                     "minified" : minify.active(), "dependencies" : dependencies}
+
+    for from_path in [path for path in manifest.pages if path not in seen]:
+        remove_stale_output(manifest.pages.pop(from_path)["dest"], dest_dir_path)
+        reasons[from_path] = "was removed"
+
+    # a changed input (or page) invalidates everything built from it, transitively
+    graph = manifest.dependency_graph()
+    inputs = sorted({path for dependencies in graph.edges.values() for path in dependencies if path not in graph.edges})
+    changed = manifest.update_inputs(inputs)
+    # an input added to the dependencies of a page is there because of another change (e.g. to its template)
+    changed = dict(sorted(changed.items(), key=lambda item: item[1] == "was added"))
+    changed.update(reasons)
+    for from_path, reason in graph.invalidated(changed).items():
+        # the dependencies of a page also change with its template, which is then the reason given
+        if from_path not in reasons or reasons[from_path].startswith(DEPENDENCIES_CHANGED):
+            reasons[from_path] = reason
+
+    stale_pages = []
+    for from_path, entry in sorted(manifest.pages.items()):
+        if from_path in reasons:
+            if explain:
+                print(f"Rebuilding '{from_path}': {reasons[from_path]}")
+            else:
+                print(f"Generating page from {from_path} to {entry['dest']} using {template_path}")
+            stale_pages.append((from_path, entry["dest"]))
 
+    return generate_pages(stale_pages, template_path, jobs, stream_threshold, io_limit)
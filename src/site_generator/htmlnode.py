@@ -1,6 +1,42 @@
-from typing import Self
+from typing import Self, Iterator, TextIO, Mapping
+from html import escape
+import functools
+
+
+@functools.lru_cache(maxsize=4096)
+def href_to_html(url : str) -> str:
+    return f" href=\"{escape(str(url))}\""
+
+
+@functools.lru_cache(maxsize=4096)
+def image_attributes_to_html(src : str, alt : str) -> str:
+    return f" src=\"{escape(str(src))}\" alt=\"{escape(str(alt))}\""
+
+
+def props_to_attributes(props : Mapping) -> str:
+    """
+    serializes the props of a node as html attributes, escaping the values e.g.
+
+    props_to_attributes({"href" : "/a?b=1&c=\"2\""}) == ' href="/a?b=1&amp;c=&quot;2&quot;"'
+
+    links and images, the only props produced by the markdown, go through cached fast paths
+    since the same urls come back over and over in a site
+    """
+    if not props:
+        return ""
+
+    if len(props) == 1 and "href" in props:
+        return href_to_html(props["href"])
+
+    if len(props) == 2 and "src" in props and "alt" in props:
+        return image_attributes_to_html(props["src"], props["alt"])
+
+    return "".join([f" {key}=\"{escape(str(value))}\"" for key, value in props.items()])
+
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, 
                  tag : str = None, 
                  value : str = None, 
@@ -15,20 +51,31 @@ class HTMLNode:
 
     def to_html(self) -> None:
         raise NotImplementedError
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        yields the html of the node in chunks, so that big trees can be
+        serialized without building the whole string in memory
+        """
+        raise NotImplementedError
+
+    def write_html(self, file : TextIO) -> None:
+        """
+        writes the html of the node into a file-like object, e.g. an open file or an io.StringIO
+        """
+        for chunk in self.iter_html():
+            file.write(chunk)
     
     def props_to_html(self) -> str:
-        props = ""
-        if self.props:
-            for k,v in self.props.items():
-                props += f" {k}=\"{v}\""
-
-        return props
+        return props_to_attributes(self.props)
 
     def __repr__(self) -> str:
         return f"(HTMLNode type) tag: {self.tag} value: {self.value} children: {self.children} props: {self.props}"
     
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, 
                  tag : str = None, 
                  value : str = None, 
@@ -51,9 +98,17 @@ class LeafNode(HTMLNode):
         
         # just tag
         return f"<{self.tag}>{self.value}</{self.tag}>"
+
+    def iter_html(self) -> Iterator[str]:
+        yield self.to_html()
+
+    def write_html(self, file : TextIO) -> None:
+        file.write(self.to_html())
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, 
                 tag : str, 
                 children : list[LeafNode], 
@@ -63,15 +118,29 @@ class ParentNode(HTMLNode):
         super().__init__(tag, None, children, props)
 
     def to_html(self) -> str:
+        return "".join(self.iter_html())
+
+    def iter_html(self) -> Iterator[str]:
         if self.tag == None:
            raise ValueError("'tag' argument must be provided")
         if self.children == None:
            raise ValueError("'children' argument must be provided")
 
-        out_string = f"<{self.tag}>"
+        yield f"<{self.tag}{props_to_attributes(self.props)}>"
         for child_node in self.children:
-           out_string += child_node.to_html()
-        
-        out_string += f"</{self.tag}>"
-        
-        return out_string
\ No newline at end of file
+           yield from child_node.iter_html()
+
+        yield f"</{self.tag}>"
+
+    def write_html(self, file : TextIO) -> None:
+        # same as iter_html but without the generator overhead at every level of the tree
+        if self.tag == None:
+           raise ValueError("'tag' argument must be provided")
+        if self.children == None:
+           raise ValueError("'children' argument must be provided")
+
+        file.write(f"<{self.tag}{props_to_attributes(self.props)}>")
+        for child_node in self.children:
+           child_node.write_html(file)
+
+        file.write(f"</{self.tag}>")
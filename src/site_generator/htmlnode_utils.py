@@ -1,8 +1,10 @@
 from typing import Type, Callable
 import re
 
-from site_generator.htmlnode import LeafNode, ParentNode
+from site_generator.htmlnode import HTMLNode, LeafNode, ParentNode
 from site_generator.textnode_utils import *
+from site_generator import profiling
+from site_generator import block_cache
 
 
 def count_markdown_heading_level(heading: str) -> int:
@@ -59,10 +61,26 @@ def strip_quote_block(quote_block: str) -> str:
     return cleaned_text
 
 
-def heading_block_to_html_node(block : str) -> Type[ParentNode]:
+def typed_block_text(block : str | MDBlock, block_type : Type[MDBlockType], type_name : str) -> str:
+    """
+    returns the text of 'block' after checking it is of type 'block_type'. Blocks coming
+    from scan_markdown_blocks are already classified, plain strings are classified here
+    """
+    if isinstance(block, MDBlock):
+        actual_type = block.block_type
+        block = block.text
+    else:
+        actual_type = block_to_block_type(block)
+
+    if actual_type != block_type:
+        raise Exception(f"Block of type different than '{type_name}' given, change block type or use appropriate function")
+
+    return block
+
+
+def heading_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
 
-    if block_to_block_type(block) != MDBlockType.heading:
-        raise Exception("Block of type different than 'heading' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.heading, "heading")
     
     heading_level = count_markdown_heading_level(block)
     text = block.lstrip('#').strip()
@@ -76,10 +94,9 @@ def heading_block_to_html_node(block : str) -> Type[ParentNode]:
     return ParentNode(outer_tag, leafs)
 
 
-def code_block_to_html_node(block : str) -> Type[ParentNode]:
+def code_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
 
-    if block_to_block_type(block) != MDBlockType.code:
-        raise Exception("Block of type different than 'code' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.code, "code")
 
     value = block.lstrip('```').rstrip('```').strip()
     pre_tag = "pre"
@@ -90,10 +107,9 @@ def code_block_to_html_node(block : str) -> Type[ParentNode]:
     return ParentNode(pre_tag, [leaf])
 
 
-def quote_block_to_html_node(block : str) -> Type[ParentNode]:
+def quote_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
     
-    if block_to_block_type(block) != MDBlockType.quote:
-        raise Exception("Block of type different than 'quote' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.quote, "quote")
 
     #text = block.lstrip('> ').strip()
     text = strip_quote_block(block)
@@ -107,10 +123,9 @@ def quote_block_to_html_node(block : str) -> Type[ParentNode]:
     return ParentNode(outer_tag, leafs)
 
 
-def unordered_list_block_to_html_node(block : str) -> Type[ParentNode]:
+def unordered_list_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
     
-    if block_to_block_type(block) != MDBlockType.unordered_list:
-        raise Exception("Block of type different than 'unordered list' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.unordered_list, "unordered list")
 
     md_elements = parse_markdown_unordered_list(block)
 
@@ -132,10 +147,9 @@ def unordered_list_block_to_html_node(block : str) -> Type[ParentNode]:
     return ParentNode("ul", parents)
     
     
-def ordered_list_block_to_html_node(block : str) -> Type[ParentNode]:
+def ordered_list_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
 
-    if block_to_block_type(block) != MDBlockType.ordered_list:
-        raise Exception("Block of type different than 'ordered list' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.ordered_list, "ordered list")
 
     md_elements = parse_markdown_ordered_list(block)
 
@@ -157,10 +171,9 @@ def ordered_list_block_to_html_node(block : str) -> Type[ParentNode]:
     return ParentNode("ol", parents)
     
 
-def paragraph_block_to_html_node(block : str) -> Type[ParentNode]:
+def paragraph_block_to_html_node(block : str | MDBlock) -> Type[ParentNode]:
     
-    if block_to_block_type(block) != MDBlockType.paragraph:
-        raise Exception("Block of type different than 'paragraph' given, change block type or use appropriate function")
+    block = typed_block_text(block, MDBlockType.paragraph, "paragraph")
     
     text_nodes = text_to_textnode(block)
     
@@ -196,15 +209,164 @@ def get_md_to_html_converter(type : Type[MDBlockType]) -> Callable:
         raise ValueError("Unrecognized markdown type")
 
 
-def markdown_to_html_node(markdown : str) -> Type[ParentNode]:
+def render_block(block : Type[MDBlock]) -> Type[HTMLNode]:
+    """
+    converts a single classified block to its html node, going through the block cache when it is on
+    """
+    cache = block_cache.active()
+
+    # blocks already rendered in this or a previous build are inserted as raw html
+    if cache is not None:
+        html = cache.get(block.text)
+        if html is not None:
+            return LeafNode(None, html)
+
+    converter = get_md_to_html_converter(block.block_type)
+    block_node = converter(block)
+
+    if cache is not None:
+        cache.put(block.text, block_node.to_html())
+
+    return block_node
+
+
+def block_heading(block : Type[MDBlock]) -> tuple[int, str, int]:
+    """
+    returns the (level, text, line) of a heading block, None for any other block e.g.
+
+    block_heading(MDBlock("## Intro", MDBlockType.heading, 7, 7)) == (2, "Intro", 7)
+    """
+    if block.block_type != MDBlockType.heading:
+        return None
+
+    level = count_markdown_heading_level(block.text)
+    return level, block.text[level + 1:], block.start_line
+
+
+def block_inline_texts(block : Type[MDBlock]) -> list[tuple[str, int]]:
+    """
+    returns the (text, line) of every part of 'block' parsed as inline markdown by the
+    converters, without its block syntax (#, >, list markers), code blocks have none e.g.
+
+    block_inline_texts(MDBlock("* a\n* b", MDBlockType.unordered_list, 3, 4)) == [("a", 3), ("b", 4)]
+    """
+    if block.block_type == MDBlockType.code:
+        return []
+    if block.block_type == MDBlockType.heading:
+        return [(block.text.lstrip('#').strip(), block.start_line)]
+    if block.block_type == MDBlockType.quote:
+        # the lines left empty at the start of the quote are stripped with it (the last line is kept by the extra one)
+        skipped = block.text.count('\n') + 2 - len(strip_quote_block(block.text + "\n.").split('\n'))
+        return [(strip_quote_block(block.text), block.start_line + skipped)]
+
+    if block.block_type == MDBlockType.unordered_list:
+        items = parse_markdown_unordered_list(block.text)
+    elif block.block_type == MDBlockType.ordered_list:
+        items = parse_markdown_ordered_list(block.text)
+    else:
+        return [(block.text, block.start_line)]
+
+    # one item per non blank line
+    numbers = [number for number, line in enumerate(block.text.split('\n'), block.start_line) if line.strip()]
+    return list(zip(items, numbers))
+
 
-    blocks = markdown_to_blocks(markdown)
+def block_urls(block : Type[MDBlock]) -> list[tuple[str, int, str]]:
+    """
+    returns the (url, line, kind) of every link and image of 'block', found by the same
+    inline scanner as the one rendering it so that both always agree e.g.
+
+    block_urls(MDBlock("see ![a](/a.png)\n[b](/b)", MDBlockType.paragraph, 5, 6)) == [("/a.png", 5, "image"), ("/b", 6, "link")]
+    """
+    urls = []
+    for text, line_number in block_inline_texts(block):
+        for node in text_to_textnode(text):
+            if node.text_type == TextNodeType.link:
+                urls.append((node.url, line_number, "link"))
+            elif node.text_type == TextNodeType.image:
+                urls.append((node.url, line_number, "image"))
+            else:
+                # links never span over lines, the other nodes keep the newlines of the text
+                line_number += node.text.count('\n')
+
+    return urls
+
+
+class MarkdownDocument:
+    """
+    result of parsing a markdown page once: the html tree of its content together
+    with its headings, so that the title does not need another pass on the markdown
+    """
+    __slots__ = ("html_node", "headings")
+
+    def __init__(self, html_node : Type[HTMLNode], headings : list[tuple[int, str, int]]) -> None:
+        self.html_node = html_node
+        self.headings = headings
+
+    @property
+    def titles(self) -> list[str]:
+        # single # headers on a line of their own
+        return [text for level, text, line in self.headings if level == 1 and '\n' not in text]
+
+    @property
+    def title(self) -> str:
+        titles = self.titles
+        if len(titles) != 1:
+            raise Exception("There must be exactly one single # header")
+
+        return titles[0]
+
+
+def markdown_to_document(markdown : str, first_line : int = 1) -> MarkdownDocument:
+
+    # blocks are classified once, while scanning
+    with profiling.stage("blocks"):
+        blocks = scan_markdown_blocks(markdown, first_line)
     block_nodes = []
-    
+    headings = []
+
     for block in blocks:
-        
-        type = block_to_block_type(block)
-        converter = get_md_to_html_converter(type)
-        block_nodes.append(converter(block))
-        
-    return ParentNode("div", block_nodes)
\ No newline at end of file
+        heading = block_heading(block)
+        if heading is not None:
+            headings.append(heading)
+        block_nodes.append(render_block(block))
+
+    return MarkdownDocument(ParentNode("div", block_nodes), headings)
+
+
+def markdown_to_html_node(markdown : str) -> Type[ParentNode]:
+    return markdown_to_document(markdown).html_node
+
+
+class StreamedMarkdown:
+    """
+    stand-in for the node returned by markdown_to_html_node that converts and writes the
+    blocks one at a time while 'lines' (e.g. an open markdown file) are read, so that
+    neither the whole markdown nor its html tree are ever kept in memory e.g.
+
+    with open("index.md") as md_file, open("index.html", "w") as html_file:
+        StreamedMarkdown(md_file).write_html(html_file)
+
+    The headings are collected while writing, like in MarkdownDocument.
+    The lines can only be consumed once, so the content can only be written once
+    """
+    def __init__(self, lines : Iterable[str], first_line : int = 1) -> None:
+        self.lines = lines
+        self.first_line = first_line
+        self.headings = []
+        self.consumed = False
+
+    titles = MarkdownDocument.titles
+
+    def write_html(self, file) -> None:
+        if self.consumed:
+            raise Exception("Streamed markdown already written")
+        self.consumed = True
+
+        file.write("<div>")
+        for block in iter_markdown_blocks(self.lines, self.first_line):
+            heading = block_heading(block)
+            if heading is not None:
+                self.headings.append(heading)
+            render_block(block).write_html(file)
+        file.write("</div>")
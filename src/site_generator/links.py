@@ -0,0 +1,96 @@
+import os
+import posixpath
+
+from site_generator.textnode_utils import iter_markdown_blocks
+from site_generator.htmlnode_utils import block_urls
+from site_generator.front_matter import split_front_matter
+from site_generator.dependencies import local_asset_path
+from site_generator.generator import find_files
+
+
+def output_files(dest_root : str) -> set[str]:
+    """
+    returns the path of every file in 'dest_root', the targets internal links can point to
+    """
+    paths = set()
+    for dir_path, _, file_names in os.walk(dest_root):
+        dir_path = posixpath.normpath(dir_path.replace(os.sep, '/'))
+        for file_name in file_names:
+            paths.add(f"{dir_path}/{file_name}")
+
+    return paths
+
+
+class LinkIndex:
+    """
+    every link and image url of the site, with the page and line it comes from e.g.
+
+    index.urls == {
+        "/majesty" : [("content/index.md", 3, "link")],
+        "/images/rivendell.png" : [("content/majesty/index.md", 5, "image")],
+    }
+
+    The internal urls are resolved against the generated site by check()
+    """
+    def __init__(self, dest_root : str) -> None:
+        self.dest_root = posixpath.normpath(dest_root)
+        self.urls = {}
+        # source -> output page, relative urls are resolved from the latter
+        self.pages = {}
+
+    def add_page(self, source : str, page_dest : str, markdown : str) -> None:
+        self.pages[source] = page_dest
+        _, body, first_line = split_front_matter(markdown)
+
+        for block in iter_markdown_blocks(body.split('\n'), first_line):
+            # the urls are found by the scanner rendering the page, code is left out like in the html
+            for url, line_number, kind in block_urls(block):
+                self.urls.setdefault(url, []).append((source, line_number, kind))
+
+    def resolve(self, url : str, page_dest : str) -> list[str]:
+        """
+        returns the output files an internal url can be served from, None for external urls
+        """
+        path = local_asset_path(url, page_dest, self.dest_root, self.dest_root)
+        if path is None:
+            return None
+        path = posixpath.normpath(path)
+
+        # /majesty can be served by public/majesty/index.html
+        return [path, f"{path}/index.html", f"{path}.html"]
+
+    def check(self, targets : set[str]) -> list[tuple[str, int, str, str]]:
+        """
+        returns the (source, line, url, kind) of every internal link or image pointing
+        to none of 'targets', sorted by source and line
+        """
+        broken = []
+        for url, uses in self.urls.items():
+            # fragments only point inside the page
+            if url.startswith('#'):
+                continue
+
+            for source, line_number, kind in uses:
+                candidates = self.resolve(url, self.pages[source])
+                if candidates is None:
+                    continue
+                if not any(candidate in targets for candidate in candidates):
+                    broken.append((source, line_number, url, kind))
+
+        return sorted(broken)
+
+
+def check_links(dir_path_content : str, dest_dir_path : str, pages : list[tuple[str, str]] = None) -> list[tuple[str, int, str, str]]:
+    """
+    collects the links of every page in 'dir_path_content' and returns the broken
+    ones (see LinkIndex.check), once 'dest_dir_path' has been built
+    """
+    if pages is None:
+        pages = [(from_path, dest_path.replace('.md', '.html')) for from_path, dest_path in find_files(dir_path_content, dest_dir_path, ".md")]
+
+    index = LinkIndex(dest_dir_path)
+    for from_path, dest_path in pages:
+        with open(from_path) as md_file:
+            index.add_page(from_path, dest_path, md_file.read())
+
+    return index.check(output_files(dest_dir_path))
@@ -1,10 +1,191 @@
+import os
+import sys
+import argparse
+
 from site_generator import generator
+from site_generator import watch
+from site_generator import profiling
+from site_generator import block_cache
+from site_generator import parse_cache
+from site_generator import links
+from site_generator import assets
+from site_generator import precompress
+from site_generator import minify
+from site_generator import search_index
+from site_generator.manifest import BuildManifest, DEFAULT_MANIFEST_PATH
+
+
+def parse_args(argv : list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Turn the markdown files in the content directory into a static html site")
+    parser.add_argument("--incremental", action="store_true",
+                        help="rebuild only the pages and static files that changed since the last build")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH,
+                        help="path of the build manifest used by --incremental")
+    parser.add_argument("--explain", action="store_true",
+                        help="with --incremental, print why each page is rebuilt")
+    parser.add_argument("--sync-static", action="store_true",
+                        help="sync the static files into public by size and modification time instead of erasing and copying everything")
+    parser.add_argument("--hash-static", action="store_true",
+                        help="when syncing, copy a static file whose size or mtime changed only if its content hash changed too")
+    parser.add_argument("--link-static", action="store_true",
+                        help="when syncing, hardlink the static files instead of copying them where the filesystem allows")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="also write every static file under a name containing its content hash and point the urls of the pages and template to it")
+    parser.add_argument("--minify", action="store_true",
+                        help="remove the comments and the whitespace browsers do not render from the generated html")
+    parser.add_argument("--search-index", action="store_true",
+                        help="write a sharded full-text search index of the pages into public/search, updated incrementally")
+    parser.add_argument("--search-shards", type=int, default=search_index.DEFAULT_SHARDS,
+                        help="number of files the terms of the search index are spread over")
+    parser.add_argument("--compress", default=None,
+                        help="comma separated compressed copies to write next to the html, css... outputs, among gz, br and zst (e.g. gz,br)")
+    parser.add_argument("--compress-min-size", type=int, default=precompress.DEFAULT_MIN_SIZE,
+                        help="outputs smaller than this many bytes are not compressed")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes rendering pages in parallel, 0 means one per CPU core")
+    parser.add_argument("--async-io", action="store_true",
+                        help="read, render and write several pages at once, overlapping the file I/O with the rendering")
+    parser.add_argument("--io-limit", type=int, default=generator.DEFAULT_IO_LIMIT,
+                        help="maximum number of pages in flight with --async-io")
+    parser.add_argument("--check-links", action="store_true",
+                        help="after the build, report the internal links and images pointing to no generated page or static file")
+    parser.add_argument("--watch", action="store_true",
+                        help="serve the site and rebuild the outputs affected by every change to the sources")
+    parser.add_argument("--port", type=int, default=8888,
+                        help="port the site is served on with --watch")
+    parser.add_argument("--poll-interval", type=float, default=0.05,
+                        help="seconds between two checks for changes with --watch")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every stage of the build and print a summary at the end")
+    parser.add_argument("--profile-top", type=int, default=10,
+                        help="number of slowest pages listed in the --profile summary")
+    parser.add_argument("--profile-trace", default=None,
+                        help="with --profile, also write every timed stage to this file in the Chrome trace format")
+    parser.add_argument("--block-cache", action="store_true",
+                        help="reuse the html of blocks already rendered, keyed by the hash of their markdown")
+    parser.add_argument("--block-cache-size", type=int, default=block_cache.DEFAULT_BLOCK_CACHE_SIZE,
+                        help="maximum number of blocks kept by --block-cache, the least recently used are evicted")
+    parser.add_argument("--block-cache-file", default=None,
+                        help="persist the --block-cache to this file across builds")
+    parser.add_argument("--parse-cache", action="store_true",
+                        help="reuse (and save) the pages parsed by previous builds, keyed by the hash of their markdown")
+    parser.add_argument("--cache-dir", default=parse_cache.DEFAULT_PARSE_CACHE_DIR,
+                        help="directory of the --parse-cache")
+    parser.add_argument("--cache-size", type=int, default=parse_cache.DEFAULT_PARSE_CACHE_SIZE // (1024 * 1024),
+                        help="maximum size in MiB of the --parse-cache, the least recently used pages are evicted")
+    parser.add_argument("--stream-threshold", type=int, default=generator.STREAM_THRESHOLD,
+                        help="markdown files bigger than this many bytes are converted and written block by block, "
+                             "-1 disables streaming")
+
+    args = parser.parse_args(argv)
+    if args.explain and not args.incremental:
+        parser.error("--explain requires --incremental")
+
+    return args
+
+
+def main(argv : list[str] = None):
+    args = parse_args(argv)
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    stream_threshold = args.stream_threshold if args.stream_threshold >= 0 else None
+    io_limit = args.io_limit if args.async_io else None
+
+    if args.minify:
+        minify.enable()
+
+    profiler = None
+    if args.profile or args.profile_trace:
+        profiler = profiling.enable(trace=args.profile_trace is not None)
+
+    cache = None
+    if args.block_cache or args.block_cache_file:
+        cache = block_cache.enable(args.block_cache_size, args.block_cache_file)
+
+    page_cache = None
+    if args.parse_cache:
+        page_cache = parse_cache.enable(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.watch:
+        watcher = watch.SiteWatcher("content", "static", "template.html", "public", stream_threshold)
+        watcher.build()
+        server = watch.serve("public", args.port)
+        try:
+            watcher.watch(args.poll_interval)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.incremental:
+        manifest = BuildManifest(args.manifest)
+        copied = generator.sync_static_contents("static", "public", manifest, args.hash_static, args.link_static)
+        if args.fingerprint:
+            assets.enable_fingerprints(generator.fingerprint_static_contents("static", "public", manifest))
+        rendered = generator.generate_pages_incremental("content", "template.html", "public", manifest, jobs, stream_threshold,
+                                                              static_dir="static", explain=args.explain, io_limit=io_limit)
+        manifest.save()
+        print(f"Incremental build: {rendered} pages rendered, {copied} static files copied")
+    else:
+        if args.sync_static or args.fingerprint:
+            manifest = BuildManifest(args.manifest)
+
+        if args.sync_static:
+            generator.sync_static_contents("static", "public", manifest, args.hash_static, args.link_static)
+        else:
+            # the outputs generated again are kept, so that the unchanged ones keep their modification time
+            keep = generator.page_outputs("content", "public")
+            keep |= {f"{path}.{codec}" for path in keep for codec in precompress.CODECS}
+            if args.search_index:
+                keep |= {os.path.normpath(path) for path in links.output_files(f"public/{search_index.SEARCH_INDEX_DIR}")}
+            generator.copy_static_contents("static", "public", keep)
+
+        if args.fingerprint:
+            assets.enable_fingerprints(generator.fingerprint_static_contents("static", "public", manifest))
+
+        if args.sync_static or args.fingerprint:
+            manifest.save()
+
+        if jobs > 1 or io_limit is not None:
+            generator.generate_pages_parallel("content", "template.html", "public", jobs, stream_threshold, io_limit)
+        else:
+            changed = generator.generate_pages_recursive("content", "template.html", "public", stream_threshold)
+            print(f"{changed} pages changed")
+
+    if args.search_index and not args.watch:
+        indexed, removed = search_index.build_search_index("content", "public", shards=args.search_shards, jobs=jobs)
+        print(f"Search index: {indexed} pages indexed, {removed} removed")
+
+    if args.compress and not args.watch:
+        codecs = precompress.available_codecs(args.compress.split(","))
+        manifest = BuildManifest(args.manifest)
+        compressed = generator.compress_outputs("public", manifest, codecs, args.compress_min_size, jobs)
+        manifest.save()
+        print(f"Compressed {compressed} outputs")
+
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Block cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), "
+              f"{stats['evictions']} evictions, {stats['entries']} entries")
+        if cache.path is not None:
+            cache.save()
+
+    if page_cache is not None:
+        page_cache.prune()
+        stats = page_cache.stats()
+        print(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), "
+              f"{stats['evictions']} evictions")
+
+    if profiler is not None:
+        print(profiler.summary(args.profile_top))
+        if args.profile_trace:
+            profiler.export_chrome_trace(args.profile_trace)
+            print(f"Chrome trace written to '{args.profile_trace}'")
 
+    if args.check_links:
+        broken_links = links.check_links("content", "public")
+        for source, line, url, kind in broken_links:
+            print(f"{source}:{line}: broken {kind} '{url}'")
+        print(f"Link check: {len(broken_links)} broken links")
+        if broken_links:
+            sys.exit(1)
 
-def main():
-    generator.copy_static_contents("static", "public")
-    generator.generate_pages_recursive("content", "template.html", "public")
-    
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
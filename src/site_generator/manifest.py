@@ -0,0 +1,172 @@
+import os
+import json
+import hashlib
+
+from site_generator.dependencies import DependencyGraph
+
+
+MANIFEST_VERSION = 7
+DEFAULT_MANIFEST_PATH = ".build_cache/manifest.json"
+# reason given by page_stale_reason when only the list of dependencies of a page changed
+DEPENDENCIES_CHANGED = "dependencies changed"
+
+
+def hash_file(path : str, chunk_size : int = 1 << 16) -> str:
+    """
+    returns the sha256 hex digest of the file at 'path', read in chunks
+    so that big static assets are never fully loaded in memory
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    on-disk record of what was produced by the last build, used to rebuild
+    only what changed e.g.
+
+    {
+        "version": 6,
+        "inputs": {"template.html": {"size": 512, "mtime": 1718000000000000000, "hash": "<sha256>"}},
+        "pages": {"content/index.md": {"hash": "<sha256>", "dest": "public/index.html", "assets": ["static/images/a.png"],
+                                      "fingerprints": false, "minified": false, "dependencies": ["template.html", "static/images/a.png"]}},
+        "static": {"static/index.css": {"size": 1024, "mtime": 1718000000000000000, "hash": "<sha256>", "dest": "public/index.css"}},
+        "fingerprints": {"static/index.css": {"size": 1024, "mtime": 1718000000000000000, "hash": "<sha256>", "dest": "public/index.3f9a1c07be.css"}},
+        "compressed": {"public/index.html": {"size": 4096, "mtime": 1718000000000000000, "hash": "<blake2b>", "codecs": ["gz", "br"]}}
+    }
+
+    'inputs' are the files the pages depend on (templates, images...), the
+    dependencies of every page form the dependency graph of the site.
+    'assets' are the static files linked by the markdown of a page
+    """
+    def __init__(self, path : str = DEFAULT_MANIFEST_PATH) -> None:
+        self.path = path
+        self.inputs = {}
+        self.pages = {}
+        self.static = {}
+        self.fingerprints = {}
+        self.compressed = {}
+
+        if os.path.exists(path):
+            self.load()
+
+    def load(self) -> None:
+        with open(self.path) as file:
+            try:
+                data = json.load(file)
+            except json.JSONDecodeError:
+                print(f"Ignoring corrupted build manifest '{self.path}'")
+                return
+
+        # manifests written by a different generator version are not trusted
+        if data.get("version") != MANIFEST_VERSION:
+            return
+
+        self.inputs = data.get("inputs", {})
+        self.pages = data.get("pages", {})
+        self.static = data.get("static", {})
+        self.fingerprints = data.get("fingerprints", {})
+        self.compressed = data.get("compressed", {})
+
+    def save(self) -> None:
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "inputs": self.inputs,
+            "pages": self.pages,
+            "static": self.static,
+            "fingerprints": self.fingerprints,
+            "compressed": self.compressed,
+        }
+
+        # write to a temporary file first so an interrupted build never leaves a truncated manifest
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def dependency_graph(self) -> DependencyGraph:
+        return DependencyGraph({from_path : entry["dependencies"] for from_path, entry in self.pages.items()})
+
+    def update_inputs(self, paths : list[str]) -> dict[str, str]:
+        """
+        records the current state of the given inputs and returns the ones that changed
+        since the last build, with what happened to them. A file is hashed only when its
+        size or modification time changed, and counts as changed only if its hash did
+        """
+        changed = {}
+        inputs = {}
+        for path in paths:
+            old_entry = self.inputs.get(path)
+            entry = None
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                if old_entry is not None and old_entry["size"] == stat.st_size and old_entry["mtime"] == stat.st_mtime_ns:
+                    entry = old_entry
+                else:
+                    entry = {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : hash_file(path)}
+                inputs[path] = entry
+
+            if old_entry is None and entry is not None:
+                changed[path] = "was added"
+            elif old_entry is not None and entry is None:
+                changed[path] = "was removed"
+            elif old_entry is not None and old_entry["hash"] != entry["hash"]:
+                changed[path] = "changed"
+
+        self.inputs = inputs
+
+        return changed
+
+    def page_stale_reason(self, from_path : str, page_hash : str, dest_path : str, dependencies : list[str], fingerprints : bool = False,
+                          minified : bool = False) -> str:
+        """
+        returns why the page must be rebuilt regardless of its dependencies, None if it does not
+        """
+        entry = self.pages.get(from_path)
+        if entry is None:
+            return "new page"
+
+        if entry["hash"] != page_hash:
+            return "markdown changed"
+
+        if entry["dest"] != dest_path or not os.path.exists(dest_path):
+            return "output missing"
+
+        if entry["dependencies"] != dependencies:
+            changes = [f"'{path}' added" for path in dependencies if path not in entry["dependencies"]]
+            changes += [f"'{path}' removed" for path in entry["dependencies"] if path not in dependencies]
+            return f"{DEPENDENCIES_CHANGED}: {', '.join(changes)}"
+
+        if entry["fingerprints"] != fingerprints:
+            return "asset fingerprinting turned on" if fingerprints else "asset fingerprinting turned off"
+
+        if entry["minified"] != minified:
+            return "minification turned on" if minified else "minification turned off"
+
+        return None
+
+    def static_is_stale(self, from_path : str, dest_path : str, stat : os.stat_result) -> bool:
+        """
+        a static file is considered unchanged when its size and modification time
+        match the last build and its output is still in place, so that big assets
+        never need to be read to find out they did not change
+        """
+        entry = self.static.get(from_path)
+        if entry is None or entry["dest"] != dest_path:
+            return True
+
+        if entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+            return True
+
+        return not os.path.exists(dest_path) or os.path.getsize(dest_path) != stat.st_size
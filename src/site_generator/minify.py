@@ -0,0 +1,81 @@
+import re
+
+
+# whitespace a browser renders as a single space: runs of several characters and lone newlines or tabs
+whitespace_run_pattern = re.compile(r'[ \t\r\n\f]{2,}|[\t\r\n\f]')
+# elements whose content is rendered as it is written, never minified (an unclosed one runs to the end)
+preserved_element_pattern = re.compile(r'<(pre|textarea|script|style)\b.*?(?:</\1\s*>|\Z)', re.S | re.I)
+# html comments, except the <!--[if IE]> conditional ones
+comment_pattern = re.compile(r'<!--(?!\[if).*?-->', re.S)
+# the space around the tags of block elements is not rendered
+block_tag_pattern = re.compile(
+    r' ?(</?(?:!doctype|html|head|body|meta|link|title|base|main|header|footer|nav|section|article|aside|div|p'
+    r'|h[1-6]|ul|ol|li|dl|dt|dd|blockquote|pre|hr|br|table|thead|tbody|tfoot|tr|th|td|form|figure|figcaption)\b[^>]*>) ?',
+    re.I,
+)
+
+
+def collapse_whitespace(text : str) -> str:
+    """
+    collapses the whitespace of a text to what a browser renders e.g.
+
+    collapse_whitespace("first line\nsecond  line") == "first line second line"
+    """
+    return whitespace_run_pattern.sub(' ', text)
+
+
+def _minify_markup(html : str) -> str:
+    return block_tag_pattern.sub(r'\1', collapse_whitespace(comment_pattern.sub('', html)))
+
+
+def minify_html(html : str) -> str:
+    """
+    removes the comments and the whitespace a browser does not render from 'html', the
+    content of <pre>, <textarea>, <script> and <style> elements is kept as it is e.g.
+
+    minify_html("<body>\n    <p>Hello\n    world</p>\n</body>") == "<body><p>Hello world</p></body>"
+    """
+    chunks = []
+    position = 0
+    block = False
+    for match in preserved_element_pattern.finditer(html):
+        chunk = _minify_markup(html[position:match.start()])
+        if block:
+            chunk = chunk.lstrip(' ')
+        # like the other block elements, <pre> is not surrounded by rendered space, nor are <script> and <style>
+        block = match.group(1).lower() != "textarea"
+        chunks.append(chunk.rstrip(' ') if block else chunk)
+        chunks.append(match.group(0))
+        position = match.end()
+    chunk = _minify_markup(html[position:])
+    chunks.append(chunk.lstrip(' ') if block else chunk)
+
+    return "".join(chunks)
+
+
+# whether the html is minified while it is produced
+_active = False
+
+
+def enable() -> None:
+    global _active
+    _active = True
+
+
+def disable() -> None:
+    global _active
+    _active = False
+
+
+def active() -> bool:
+    return _active
+
+
+def minified_template(template):
+    """
+    returns 'template' with its literal html minified, computed once per template
+    """
+    if not _active:
+        return template
+
+    return template.derive("minify", "", minify_html)
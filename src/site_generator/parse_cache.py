@@ -0,0 +1,139 @@
+import os
+import zlib
+import marshal
+import hashlib
+
+from site_generator import assets
+from site_generator import minify
+
+
+# bump whenever the html produced for a page changes, so that the cached pages are discarded
+PARSE_CACHE_VERSION = 2
+DEFAULT_PARSE_CACHE_DIR = ".build_cache/pages"
+DEFAULT_PARSE_CACHE_SIZE = 256 * 1024 * 1024
+
+
+def page_key(markdown : str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    # entries written by another cache or marshal format version, for other asset fingerprints
+    # or with the other minification setting are never looked up
+    digest.update(f"{PARSE_CACHE_VERSION}:{marshal.version}:{assets.fingerprints_digest()}:{minify.active():d}:".encode())
+    digest.update(markdown.encode())
+
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    on-disk cache of parsed pages: maps the markdown of a page to its front matter,
+    headings and body html, so that a page whose markdown did not change (e.g. after
+    a template change) is never parsed again. Every page is a small zlib compressed
+    marshal file in 'path', the least recently used ones are evicted by prune()
+    once the files take more than 'max_bytes'
+    """
+    def __init__(self, path : str = DEFAULT_PARSE_CACHE_DIR, max_bytes : int = DEFAULT_PARSE_CACHE_SIZE) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def entry_path(self, key : str) -> str:
+        return f"{self.path}/{key[:2]}/{key}.bin"
+
+    def get(self, markdown : str) -> tuple[dict, list, str]:
+        entry_path = self.entry_path(page_key(markdown))
+        try:
+            with open(entry_path, "rb") as file:
+                metadata, headings, html = marshal.loads(zlib.decompress(file.read()))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, EOFError, TypeError, zlib.error):
+            print(f"Ignoring corrupted parse cache entry '{entry_path}'")
+            self.misses += 1
+            return None
+
+        # the modification time is the last use, for the eviction
+        os.utime(entry_path)
+        self.hits += 1
+        return metadata, [tuple(heading) for heading in headings], html
+
+    def put(self, markdown : str, metadata : dict, headings : list, html : str) -> None:
+        entry_path = self.entry_path(page_key(markdown))
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+
+        # written to a temporary file first, several processes can fill the cache at once
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(zlib.compress(marshal.dumps((metadata, headings, html))))
+        os.replace(tmp_path, entry_path)
+
+    def prune(self) -> int:
+        """
+        removes the least recently used entries until the cache fits in 'max_bytes',
+        returns the number of removed entries
+        """
+        entries = []
+        total_bytes = 0
+        for entry_dir in os.scandir(self.path) if os.path.isdir(self.path) else []:
+            # stray files next to the entry directories (editor or OS artifacts) are left alone
+            if not entry_dir.is_dir():
+                continue
+            for entry in os.scandir(entry_dir.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        removed = 0
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(entry_path)
+            total_bytes -= size
+            removed += 1
+
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "evictions" : self.evictions,
+            "hit_rate" : self.hits / lookups if lookups else 0.0,
+        }
+
+    def export_state(self) -> dict:
+        """
+        returns the statistics and resets them, the entries themselves are shared
+        on disk. Used to send the work of a worker process back to the main one
+        """
+        state = {"hits" : self.hits, "misses" : self.misses}
+        self.hits = self.misses = 0
+
+        return state
+
+    def merge(self, state : dict) -> None:
+        self.hits += state["hits"]
+        self.misses += state["misses"]
+
+
+# the cache used by the page generation, None when caching is off
+_active = None
+
+
+def enable(path : str = DEFAULT_PARSE_CACHE_DIR, max_bytes : int = DEFAULT_PARSE_CACHE_SIZE) -> ParseCache:
+    global _active
+    _active = ParseCache(path, max_bytes)
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> ParseCache:
+    return _active
@@ -0,0 +1,126 @@
+import os
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    # optional, .br files are not written without it
+    brotli = None
+
+try:
+    # in the standard library from python 3.14
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        # optional, .zst files are not written without it
+        zstd = None
+
+
+# extensions of the outputs worth compressing, images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map")
+# below this size (in bytes) the headers of a compressed response cost more than they save
+DEFAULT_MIN_SIZE = 1024
+
+
+def _gzip(data : bytes) -> bytes:
+    # no timestamp in the header, the same content is always compressed to the same bytes
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data : bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+def _zstd(data : bytes) -> bytes:
+    # same signature in the standard library and in zstandard
+    return zstd.compress(data, level=19)
+
+
+# extension of the compressed file -> compression function, None when the codec is not installed
+CODECS = {
+    "gz" : _gzip,
+    "br" : _brotli if brotli is not None else None,
+    "zst" : _zstd if zstd is not None else None,
+}
+
+
+def available_codecs(requested : list[str]) -> list[str]:
+    """
+    returns the requested codecs that can be used, warning about the others
+    """
+    codecs = []
+    for codec in requested:
+        if codec not in CODECS:
+            raise Exception(f"Unknown compression '{codec}', choose among {', '.join(CODECS)}")
+        if CODECS[codec] is None:
+            print(f"Skipping '.{codec}' outputs, the module needed to write them is not installed")
+            continue
+        codecs.append(codec)
+
+    return codecs
+
+
+def compressed_paths(path : str, codecs : list[str]) -> list[str]:
+    return [f"{path}.{codec}" for codec in codecs]
+
+
+def remove_compressed(path : str, codecs : list[str]) -> None:
+    for sibling in compressed_paths(path, codecs):
+        if os.path.exists(sibling):
+            os.remove(sibling)
+
+
+def compress_file(path : str, codecs : list[str], min_size : int, entry : dict) -> tuple[dict, bool]:
+    """
+    writes the compressed siblings of 'path' (index.html -> index.html.gz, index.html.br...)
+    unless its content is the one they were written from, as recorded in 'entry' by the
+    previous call. Files smaller than 'min_size' get no siblings.
+    Returns the entry to keep for the next build and whether the siblings were written
+    """
+    stat = os.stat(path)
+    siblings = compressed_paths(path, codecs)
+
+    if entry is not None:
+        remove_compressed(path, [codec for codec in entry["codecs"] if codec not in codecs])
+
+    if stat.st_size < min_size:
+        remove_compressed(path, codecs)
+        return {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : None, "codecs" : []}, False
+
+    unchanged = (entry is not None and entry["codecs"] == codecs and entry["hash"] is not None
+                 and all(os.path.exists(sibling) for sibling in siblings))
+    # same size and modification time, the file was not even rewritten
+    if unchanged and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+        return entry, False
+
+    with open(path, "rb") as file:
+        data = file.read()
+    file_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    # rewritten with the same content (e.g. a page rebuilt after a template change that did not affect it)
+    written = not (unchanged and entry["hash"] == file_hash)
+    if written:
+        for codec, sibling in zip(codecs, siblings):
+            tmp_path = f"{sibling}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(CODECS[codec](data))
+            os.replace(tmp_path, sibling)
+
+    return {"size" : stat.st_size, "mtime" : stat.st_mtime_ns, "hash" : file_hash, "codecs" : codecs}, written
+
+
+def _compress_job(job : tuple[str, list[str], int, dict]) -> tuple[dict, bool]:
+    return compress_file(*job)
+
+
+def find_compressible_files(dest_dir : str) -> list[str]:
+    paths = []
+    for dir_path, _, file_names in os.walk(dest_dir):
+        for file_name in sorted(file_names):
+            if file_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                paths.append(os.path.join(dir_path, file_name).replace(os.sep, '/'))
+
+    return sorted(paths)
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+from contextlib import nullcontext
+
+
+class BuildProfiler:
+    """
+    collects the time spent in each stage of the build, the time spent on each page and
+    a few counters (e.g. bytes read and written). Stages can be nested: the 'self' time
+    of a stage does not include the time of the stages nested in it.
+
+    With 'trace' every single stage run is also recorded, to be exported in the
+    Chrome trace event format (chrome://tracing, https://ui.perfetto.dev)
+    """
+    def __init__(self, trace : bool = False) -> None:
+        self.trace = trace
+        # stage name -> [calls, total ns, self ns]
+        self.stages = {}
+        self.counters = {}
+        self.page_times = {}
+        self.events = []
+        self._stack = []
+
+    def stage(self, name : str, page : str = None) -> "_StageTimer":
+        return _StageTimer(self, name, page)
+
+    def count(self, name : str, amount : int) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name : str, page : str, start : int, duration : int, children : int) -> None:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = [0, 0, 0]
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] += duration - children
+
+        if page is not None and name == "page":
+            self.page_times[page] = duration
+
+        if self.trace:
+            self.events.append((name, page, start, duration, os.getpid()))
+
+    def export_state(self) -> dict:
+        """
+        returns the collected data and resets the profiler, used to send the
+        data of a worker process back to the main one
+        """
+        state = {"stages" : self.stages, "counters" : self.counters, "page_times" : self.page_times, "events" : self.events}
+        self.stages, self.counters, self.page_times, self.events = {}, {}, {}, []
+
+        return state
+
+    def merge(self, state : dict) -> None:
+        for name, (calls, total, self_time) in state["stages"].items():
+            stats = self.stages.setdefault(name, [0, 0, 0])
+            stats[0] += calls
+            stats[1] += total
+            stats[2] += self_time
+        for name, amount in state["counters"].items():
+            self.count(name, amount)
+        self.page_times.update(state["page_times"])
+        self.events.extend(state["events"])
+
+    def summary(self, top : int = 10) -> str:
+        lines = ["Build profile", f"  {'stage':<12} {'calls':>8} {'total ms':>12} {'self ms':>12}"]
+        for name, (calls, total, self_time) in sorted(self.stages.items(), key=lambda item: -item[1][2]):
+            lines.append(f"  {name:<12} {calls:>8} {total / 1e6:>12.2f} {self_time / 1e6:>12.2f}")
+
+        if self.page_times:
+            lines.append(f"Slowest {min(top, len(self.page_times))} pages")
+            slowest = sorted(self.page_times.items(), key=lambda item: -item[1])[:top]
+            for page, duration in slowest:
+                lines.append(f"  {duration / 1e6:>10.2f} ms  {page}")
+
+        if self.counters:
+            lines.append("Counters")
+            for name, amount in sorted(self.counters.items()):
+                lines.append(f"  {name:<20} {amount}")
+
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path : str) -> None:
+        trace_events = []
+        for name, page, start, duration, pid in self.events:
+            event = {"name" : name, "cat" : "build", "ph" : "X", "ts" : start / 1000, "dur" : duration / 1000, "pid" : pid, "tid" : pid}
+            if page is not None:
+                event["args"] = {"page" : page}
+            trace_events.append(event)
+
+        with open(path, "w") as file:
+            json.dump({"traceEvents" : trace_events, "displayTimeUnit" : "ms"}, file)
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "name", "page", "start")
+
+    def __init__(self, profiler : BuildProfiler, name : str, page : str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+
+    def __enter__(self) -> None:
+        self.profiler._stack.append(0)
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        duration = time.perf_counter_ns() - self.start
+        stack = self.profiler._stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += duration
+        self.profiler.record(self.name, self.page, self.start, duration, children)
+
+
+# the profiler of the running build, None when profiling is off
+_active = None
+_null_stage = nullcontext()
+
+
+def enable(trace : bool = False) -> BuildProfiler:
+    global _active
+    _active = BuildProfiler(trace)
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> BuildProfiler:
+    return _active
+
+
+def stage(name : str, page : str = None):
+    """
+    context manager timing the code in its block as stage 'name',
+    it costs next to nothing when profiling is off e.g.
+
+    with profiling.stage("parse"):
+        html_node = markdown_to_html_node(markdown)
+    """
+    if _active is None:
+        return _null_stage
+    return _active.stage(name, page)
+
+
+def count(name : str, amount : int) -> None:
+    if _active is not None:
+        _active.count(name, amount)
+
+
+def count_file(name : str, path : str) -> None:
+    """
+    adds the size of the file at 'path' to the counter 'name', the file
+    is not even looked at when profiling is off
+    """
+    if _active is not None:
+        _active.count(name, os.path.getsize(path))
@@ -0,0 +1,351 @@
+import os
+import re
+import json
+import gzip
+import shutil
+import tempfile
+import itertools
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from site_generator.textnode_utils import iter_markdown_blocks, text_to_textnode
+from site_generator.htmlnode_utils import MarkdownDocument, block_heading, block_inline_texts
+from site_generator.front_matter import split_front_matter
+from site_generator.manifest import hash_file
+from site_generator.assets import replace_if_changed, write_if_changed
+from site_generator.generator import find_files
+
+
+# bump whenever the format of the index changes, so that it is built again from scratch
+SEARCH_INDEX_VERSION = 2
+DEFAULT_SHARDS = 32
+DEFAULT_SEARCH_STATE_PATH = ".build_cache/search.json"
+# directory of the index in the generated site
+SEARCH_INDEX_DIR = "search"
+# pages tokenized before their postings are spilled to disk, bounds the memory of big sites
+INDEX_BATCH_SIZE = 256
+# longer words are most likely urls or hashes nobody searches for
+MAX_TERM_LENGTH = 64
+
+word_pattern = re.compile(r'\w+')
+
+
+def tokenize(text : str) -> list[str]:
+    """
+    returns the lowercase words of 'text' e.g.
+
+    tokenize("The Lord of the Rings, 1954") == ["the", "lord", "of", "the", "rings", "1954"]
+    """
+    return [word for word in word_pattern.findall(text.lower()) if len(word) <= MAX_TERM_LENGTH]
+
+
+def term_shard(term : str, shards : int) -> int:
+    """
+    shard of the index a term is stored in: the 32 bit FNV-1a hash of its utf-8 bytes
+    modulo the number of shards, simple enough to be computed again by the client
+    """
+    term_hash = 0x811c9dc5
+    for byte in term.encode():
+        term_hash = ((term_hash ^ byte) * 0x01000193) & 0xffffffff
+
+    return term_hash % shards
+
+
+def delta_encode(numbers : list[int]) -> list[int]:
+    """
+    sorted numbers as the differences between consecutive ones, which are smaller and
+    compress better e.g. delta_encode([3, 10, 12]) == [3, 7, 2]
+    """
+    previous = 0
+    deltas = []
+    for number in numbers:
+        deltas.append(number - previous)
+        previous = number
+
+    return deltas
+
+
+def delta_decode(deltas : list[int]) -> list[int]:
+    return list(itertools.accumulate(deltas))
+
+
+def page_terms(markdown : str) -> tuple[str, dict[str, list[int]]]:
+    """
+    returns the title of a page and the positions of every term of its text (link
+    texts and image alt texts included) in a single pass on the markdown e.g.
+
+    page_terms("# Home\n\nHello *home*") == ("Home", {"home" : [0, 2], "hello" : [1]})
+    """
+    _, body, first_line = split_front_matter(markdown)
+    headings = []
+    terms = {}
+    position = 0
+
+    for block in iter_markdown_blocks(body.split('\n'), first_line):
+        heading = block_heading(block)
+        if heading is not None:
+            headings.append(heading)
+
+        # the words of a block are split at once, the inline markup only separates them
+        texts = [node.text for text, _ in block_inline_texts(block) for node in text_to_textnode(text) if node.text is not None]
+        for term in tokenize(" ".join(texts)):
+            terms.setdefault(term, []).append(position)
+            position += 1
+
+    return MarkdownDocument(None, headings).title, terms
+
+
+def page_url(dest_path : str, dest_root : str) -> str:
+    """
+    site url of a generated page e.g. page_url("public/majesty/index.html", "public") == "/majesty/"
+    """
+    url = "/" + posixpath.relpath(dest_path, dest_root)
+    if url.endswith("/index.html"):
+        url = url[:-len("index.html")]
+
+    return url
+
+
+def _index_page_job(from_path : str) -> tuple[str, str, dict[str, list[int]]]:
+    try:
+        with open(from_path) as md_file:
+            page_title, terms = page_terms(md_file.read())
+    except Exception as e:
+        # named like in generator._generate_page_job
+        raise Exception(f"Failed to index page from '{from_path}': {e}") from e
+
+    return from_path, page_title, terms
+
+
+def _read_gzip_json(path : str):
+    with gzip.open(path, "rt") as file:
+        return json.load(file)
+
+
+def _write_gzip_json(path : str, data) -> bool:
+    # reproducible like precompress._gzip, but fast: the shards are compressed again at every update, and on the
+    # delta encoded postings higher levels take about ten times longer for less than 15% of size
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(gzip.compress(json.dumps(data, sort_keys=True, separators=(',', ':')).encode(), compresslevel=1, mtime=0))
+
+    return replace_if_changed(tmp_path, path)
+
+
+class SearchIndex:
+    """
+    full-text search index of the site, sharded by term and written as gzipped json
+    into 'dest_root'/search for a client side search e.g.
+
+    search/index.json        {"version": 2, "shards": 32, "hash": "fnv1a32", "pages": 2, "ids": 2}
+    search/pages.json.gz     [["/", "Tolkien Fan Club"], ["/majesty/", "The Majesty of Tolkien"]]
+    search/terms-07.json.gz  {"tolkien": [[0, [2, 7]], [1, [4]]], ...}
+
+    a term is looked up in the shard term_shard(term, shards), where it maps to the ids
+    of the pages containing it (their index in pages.json) with its positions in each page,
+    both delta encoded: above, "tolkien" is at positions 2 and 9 of page 0 and 4 of page 1.
+    The ids of removed pages are given to the next new pages, until then their entry of
+    pages.json is null: "ids" is the length of pages.json, "pages" the number of pages.
+    What was indexed is recorded in 'state_path', so that only the pages whose markdown
+    changed are tokenized again and only the shards holding their terms are rewritten,
+    one at a time
+    """
+    def __init__(self, dest_root : str, state_path : str = DEFAULT_SEARCH_STATE_PATH, shards : int = DEFAULT_SHARDS) -> None:
+        self.dest_root = posixpath.normpath(dest_root)
+        self.index_dir = f"{self.dest_root}/{SEARCH_INDEX_DIR}"
+        self.state_path = state_path
+        self.shards = shards
+        # source -> {"id", "hash", "url", "title", "shards"} of every indexed page, "shards" being
+        # the bitmask of the shards holding its terms
+        self.pages = {}
+        self.next_id = 0
+
+        state = None
+        if os.path.exists(state_path):
+            try:
+                with open(state_path) as file:
+                    state = json.load(file)
+            except (json.JSONDecodeError, OSError):
+                print(f"Ignoring corrupted search index state '{state_path}'")
+
+        # an index written with other settings, or erased with the outputs, is built again
+        if (state is not None and state.get("version") == SEARCH_INDEX_VERSION and state.get("shards") == shards
+                and os.path.exists(f"{self.index_dir}/index.json")):
+            self.pages = state["pages"]
+            self.next_id = state["next_id"]
+        elif os.path.isdir(self.index_dir):
+            shutil.rmtree(self.index_dir)
+
+    def shard_path(self, shard : int) -> str:
+        return f"{self.index_dir}/terms-{shard:02d}.json.gz"
+
+    def read_shard(self, shard : int) -> dict[str, list]:
+        """
+        returns the postings of a shard with absolute page ids, the positions are left delta encoded
+        """
+        if not os.path.exists(self.shard_path(shard)):
+            return {}
+
+        postings = _read_gzip_json(self.shard_path(shard))
+        for term_postings in postings.values():
+            page_id = 0
+            for posting in term_postings:
+                page_id += posting[0]
+                posting[0] = page_id
+
+        return postings
+
+    def write_shard(self, shard : int, postings : dict[str, list]) -> bool:
+        for term_postings in postings.values():
+            term_postings.sort()
+            previous = 0
+            for posting in term_postings:
+                posting[0], previous = posting[0] - previous, posting[0]
+
+        return _write_gzip_json(self.shard_path(shard), postings)
+
+    def lookup(self, term : str) -> list[tuple[str, list[int]]]:
+        """
+        returns the (url, positions) of the pages containing 'term', as a client would
+        """
+        term = term.lower()
+        urls = _read_gzip_json(f"{self.index_dir}/pages.json.gz")
+
+        postings = self.read_shard(term_shard(term, self.shards)).get(term, [])
+
+        return [(urls[page_id][0], delta_decode(positions)) for page_id, positions in postings]
+
+    def update(self, pages : list[tuple[str, str]], jobs : int = 1) -> tuple[int, int]:
+        """
+        brings the index up to date with the given (source, output page) pairs: the new and
+        changed pages are tokenized, by 'jobs' processes when jobs > 1, and the pages no
+        longer given are removed. Returns the number of indexed and removed pages
+        """
+        seen = set()
+        stale = []
+        for from_path, dest_path in pages:
+            seen.add(from_path)
+            page_hash = hash_file(from_path)
+            url = page_url(dest_path, self.dest_root)
+            entry = self.pages.get(from_path)
+            if entry is None or entry["hash"] != page_hash or entry["url"] != url:
+                stale.append((from_path, page_hash, url))
+
+        removed = [from_path for from_path in self.pages if from_path not in seen]
+        # the postings of changed and removed pages are dropped from the shards holding them
+        dropped = [self.pages[from_path] for from_path, _, _ in stale if from_path in self.pages]
+        dropped += [self.pages.pop(from_path) for from_path in removed]
+        dropped_ids = {entry["id"] for entry in dropped}
+        dropped_shards = 0
+        for entry in dropped:
+            dropped_shards |= entry["shards"]
+
+        if not stale and not removed and os.path.exists(f"{self.index_dir}/index.json"):
+            return 0, 0
+
+        # the ids left free by removed pages are reused first, smallest first, so that pages.json does not fill up with holes
+        used_ids = {entry["id"] for entry in self.pages.values()}
+        free_ids = [page_id for page_id in range(self.next_id - 1, -1, -1) if page_id not in used_ids]
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory() as runs_dir:
+            self._tokenize(stale, runs_dir, jobs, free_ids)
+            for shard in range(self.shards):
+                self._merge_shard(shard, f"{runs_dir}/{shard}.jsonl", dropped_ids if dropped_shards >> shard & 1 else set())
+
+        # the free ids at the end of pages.json are dropped
+        self.next_id = max((entry["id"] for entry in self.pages.values()), default=-1) + 1
+        urls = [None] * self.next_id
+        for entry in self.pages.values():
+            urls[entry["id"]] = [entry["url"], entry["title"]]
+        _write_gzip_json(f"{self.index_dir}/pages.json.gz", urls)
+        write_if_changed(f"{self.index_dir}/index.json",
+                         json.dumps({"version" : SEARCH_INDEX_VERSION, "shards" : self.shards, "hash" : "fnv1a32",
+                                     "pages" : len(self.pages), "ids" : self.next_id}))
+
+        return len(stale), len(removed)
+
+    def _tokenize(self, stale : list[tuple[str, str, str]], runs_dir : str, jobs : int, free_ids : list[int]) -> None:
+        # the postings are spilled to one run file per shard as the pages are tokenized
+        runs = [open(f"{runs_dir}/{shard}.jsonl", "w") for shard in range(self.shards)]
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and len(stale) > 1 else None
+        try:
+            for start in range(0, len(stale), INDEX_BATCH_SIZE):
+                batch = stale[start:start + INDEX_BATCH_SIZE]
+                paths = [from_path for from_path, _, _ in batch]
+                if executor is not None:
+                    results = executor.map(_index_page_job, paths, chunksize=max(1, len(paths) // (jobs * 4)))
+                else:
+                    results = map(_index_page_job, paths)
+
+                for (from_path, page_hash, url), (_, page_title, terms) in zip(batch, results):
+                    entry = self.pages.get(from_path)
+                    # a changed page keeps its id, a new one takes a free id ('free_ids' is sorted in reverse order)
+                    if entry is None and free_ids:
+                        entry = {"id" : free_ids.pop()}
+                    elif entry is None:
+                        entry = {"id" : self.next_id}
+                        self.next_id += 1
+                    page_shards = 0
+                    for term, positions in terms.items():
+                        shard = term_shard(term, self.shards)
+                        page_shards |= 1 << shard
+                        runs[shard].write(json.dumps([term, entry["id"], delta_encode(positions)]) + "\n")
+
+                    self.pages[from_path] = {"id" : entry["id"], "hash" : page_hash, "url" : url, "title" : page_title, "shards" : page_shards}
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            for run in runs:
+                run.close()
+
+    def _merge_shard(self, shard : int, run_path : str, dropped_ids : set[int]) -> None:
+        # only one shard is in memory at a time
+        if not dropped_ids and os.path.getsize(run_path) == 0 and os.path.exists(self.shard_path(shard)):
+            return
+
+        postings = self.read_shard(shard)
+        if dropped_ids:
+            for term in list(postings):
+                kept = [posting for posting in postings[term] if posting[0] not in dropped_ids]
+                if kept:
+                    postings[term] = kept
+                else:
+                    del postings[term]
+
+        with open(run_path) as run:
+            for line in run:
+                term, page_id, positions = json.loads(line)
+                postings.setdefault(term, []).append([page_id, positions])
+
+        self.write_shard(shard, postings)
+
+    def save(self) -> None:
+        state_dir = os.path.dirname(self.state_path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+        # write to a temporary file first so an interrupted build never leaves a truncated state
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"version" : SEARCH_INDEX_VERSION, "shards" : self.shards, "next_id" : self.next_id, "pages" : self.pages}, file)
+        os.replace(tmp_path, self.state_path)
+
+
+def build_search_index(dir_path_content : str,
+                       dest_dir_path : str,
+                       state_path : str = DEFAULT_SEARCH_STATE_PATH,
+                       shards : int = DEFAULT_SHARDS,
+                       jobs : int = 1
+    ) -> tuple[int, int]:
+    """
+    updates the search index of the pages of 'dir_path_content' generated into
+    'dest_dir_path' (see SearchIndex), returns the number of indexed and removed pages
+    """
+    pages = [(from_path, dest_path.replace('.md', '.html')) for from_path, dest_path in find_files(dir_path_content, dest_dir_path, ".md")]
+
+    index = SearchIndex(dest_dir_path, state_path, shards)
+    indexed, removed = index.update(pages, jobs)
+    index.save()
+
+    return indexed, removed
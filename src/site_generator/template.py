@@ -0,0 +1,96 @@
+import os
+import re
+from typing import TextIO, Iterator, Callable
+
+
+# matches a {{ Name }} placeholder, the name is captured
+placeholder_pattern = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class Template:
+    """
+    html template compiled once into a list alternating literal segments and placeholder names, e.g.
+
+    Template("<title>{{ Title }}</title><body>{{ Content }}</body>").segments == [
+                                                                                "<title>", "Title", "</title><body>", "Content", "</body>"
+                                                                            ]
+
+    literal segments are at even indexes and placeholder names at odd indexes
+    """
+    def __init__(self, source : str) -> None:
+        self.segments = placeholder_pattern.split(source)
+        self.placeholders = set(self.segments[1::2])
+        # (name, key) -> template derived from this one, see derive()
+        self.derived = {}
+
+    def rewrite_literals(self, rewrite : Callable[[str], str]) -> "Template":
+        """
+        returns a copy of the template with 'rewrite' applied to its literal html, the placeholders are left untouched
+        """
+        template = Template("")
+        template.segments = [rewrite(segment) if i % 2 == 0 else segment for i, segment in enumerate(self.segments)]
+        template.placeholders = self.placeholders
+
+        return template
+
+    def derive(self, name : str, key : str, rewrite : Callable[[str], str]) -> "Template":
+        """
+        same as rewrite_literals, but computed once and kept on the template: 'key' identifies
+        what the rewrite depends on (e.g. the asset fingerprints), a new key replaces the copy
+        derived under 'name' before. The copies go away with the template, e.g. when
+        load_template compiles a changed file again
+        """
+        cached = self.derived.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, self.rewrite_literals(rewrite))
+            self.derived[name] = cached
+
+        return cached[1]
+
+    def iter_render(self, values : dict) -> Iterator:
+        """
+        yields the rendered template in chunks. A value can be a string or an html node,
+        the latter is streamed with its write_html method by write(). Placeholders
+        without a value are left untouched
+        """
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                if segment:
+                    yield segment
+            elif segment in values:
+                yield values[segment]
+            else:
+                yield f"{{{{ {segment} }}}}"
+
+    def render(self, values : dict) -> str:
+        return "".join(value if isinstance(value, str) else value.to_html() for value in self.iter_render(values))
+
+    def write(self, file : TextIO, values : dict) -> None:
+        for value in self.iter_render(values):
+            if isinstance(value, str):
+                file.write(value)
+            else:
+                value.write_html(file)
+
+
+# compiled templates by path, each entry keeps the modification time it was compiled at
+_template_cache = {}
+
+
+def load_template(template_path : str) -> Template:
+    """
+    returns the compiled template at 'template_path', the file is read and compiled
+    again only when its modification time changes
+    """
+    mtime = os.stat(template_path).st_mtime_ns
+
+    cached = _template_cache.get(template_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(template_path) as template_file:
+        template = Template(template_file.read())
+
+    _template_cache[template_path] = (mtime, template)
+
+    return template
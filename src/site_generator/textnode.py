@@ -7,6 +7,9 @@ MDBlockType = Enum('MDBlockType', ['paragraph', 'heading', 'code', 'quote', 'uno
 
 
 class TextNode:
+    # no per instance __dict__, pages are made of a lot of nodes
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text : str, text_type : str, url : str=None) -> None:
         self.text = text
         self.text_type = text_type
@@ -22,3 +25,22 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
 
 
+class MDBlock:
+    """
+    markdown block already classified by the block scanner, with the
+    (1-based, inclusive) lines it spans in the source document
+    """
+    __slots__ = ("text", "block_type", "start_line", "end_line")
+
+    def __init__(self, text : str, block_type : MDBlockType, start_line : int = None, end_line : int = None) -> None:
+        self.text = text
+        self.block_type = block_type
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def __eq__(self, other_block : Self) -> bool:
+        return (self.text, self.block_type, self.start_line, self.end_line) == \
+               (other_block.text, other_block.block_type, other_block.start_line, other_block.end_line)
+
+    def __repr__(self) -> str:
+        return f"MDBlock({self.text!r}, {self.block_type}, lines {self.start_line}-{self.end_line})"
@@ -1,34 +1,56 @@
-from typing import Type
+from typing import Type, Iterable, Iterator
+from types import MappingProxyType
 import re
 import warnings 
+import functools
 
 from site_generator.htmlnode import LeafNode
-from site_generator.textnode import TextNodeType, TextNode, MDBlockType
+from site_generator.textnode import TextNodeType, TextNode, MDBlockType, MDBlock
+from site_generator import profiling
+from site_generator.assets import fingerprinted_url
+from site_generator import minify
+
+
+@functools.lru_cache(maxsize=4096)
+def link_props(url : str) -> MappingProxyType:
+    """
+    read-only props of a link, shared by all the links to the same url
+    """
+    return MappingProxyType({"href" : f"{url}"})
+
+
+@functools.lru_cache(maxsize=4096)
+def image_props(url : str, alt_text : str) -> MappingProxyType:
+    """
+    read-only props of an image, shared by all the images with the same url and alt text
+    """
+    return MappingProxyType({"src" : url, "alt" : alt_text})
 
 
 def text_node_to_html_node(text_node : Type[TextNode]) -> Type[LeafNode]:
 
+    text = text_node.text
+    # minified pages get the whitespace of their text collapsed, code is left as it is
+    if minify.active() and text_node.text_type not in (TextNodeType.code, TextNodeType.image):
+        text = minify.collapse_whitespace(text)
+
     if text_node.text_type == TextNodeType.text:
-        return LeafNode(None, text_node.text, None)
+        return LeafNode(None, text, None)
     
     elif text_node.text_type == TextNodeType.bold:
-        return LeafNode("b", text_node.text, None)
+        return LeafNode("b", text, None)
     
     elif text_node.text_type == TextNodeType.italic:
-        return LeafNode("i", text_node.text, None)
+        return LeafNode("i", text, None)
     
     elif text_node.text_type == TextNodeType.code:
-        return LeafNode("code", text_node.text, None)
+        return LeafNode("code", text, None)
     
     elif text_node.text_type == TextNodeType.link:
-        return LeafNode("a", text_node.text, {"href" : f"{text_node.url}"})
+        return LeafNode("a", text, link_props(fingerprinted_url(text_node.url)))
     
     elif text_node.text_type == TextNodeType.image:
-        props = {
-            "src" : text_node.url,
-            "alt" : text_node.text
-        }
-        return LeafNode("img", text_node.text, props)
+        return LeafNode("img", text_node.text, image_props(fingerprinted_url(text_node.url), text_node.text))
     
     raise Exception('Invalid text node type')
 
@@ -283,50 +305,299 @@ def split_markdown_imgs_links_with_indices(text : str, img : bool) -> tuple[list
     return result, alt_text_indices
 
 
+# characters that can open an inline element, everything in between is plain text
+_inline_special_pattern = re.compile(r'[`*\[!]')
+_link_special_pattern = re.compile(r'[\[!]')
+
+
+def _find_standalone_delimiter(text : str, start : int, run_length : int) -> int:
+    """
+    returns the index of the first run of exactly 'run_length' '*' characters
+    at or after 'start', or -1 if there is none
+    """
+    i = text.find('*', start)
+    while i != -1:
+        end = i
+        while end < len(text) and text[end] == '*':
+            end += 1
+        if end - i == run_length:
+            return i
+        i = text.find('*', end)
+
+    return -1
+
+
+def _match_bracket_url(text : str, start : int, cache : dict, blocking_tokens : tuple[str]) -> tuple[int, int]:
+    """
+    matches '[alt text](url)' with the '[' at index 'start', with the same rules as the
+    regex patterns in split_markdown_imgs_links_with_indices (shortest alt text and url,
+    no newlines and none of the 'blocking_tokens' inside). Returns the indices of the
+    '](' and of the closing ')', or None.
+
+    'cache' maps each searched token to its last found position: the scan only moves
+    forward so a token is searched again only once passed, which keeps the whole scan linear
+    """
+    def next_position(token : str, after : int) -> int:
+        position = cache.get(token)
+        if position is None or (position != -1 and position <= after):
+            position = text.find(token, after + 1)
+            cache[token] = position
+        return position
+
+    middle = next_position('](', start)
+    if middle == -1:
+        return None
+
+    end = next_position(')', middle + 1)
+    if end == -1:
+        return None
+
+    for token in blocking_tokens:
+        position = next_position(token, start)
+        if position != -1 and position < end:
+            return None
+
+    return middle, end
+
+
+def _scan_inline(text : str, text_type : Type[TextNodeType], nodes : list[TextNode]) -> None:
+    """
+    appends to 'nodes' the TextNode stream of 'text'. Delimiters are parsed only in plain text,
+    the content of bold and italic parts is scanned again just for links and images, as the
+    chained split_nodes_link and split_nodes_image used to do
+    """
+    parse_delimiters = text_type == TextNodeType.text
+    if parse_delimiters:
+        special_pattern = _inline_special_pattern
+        # a link can not span over a part that the delimiter splitting would have separated
+        blocking_tokens = ('\n', '`', '*')
+    else:
+        special_pattern = _link_special_pattern
+        blocking_tokens = ('\n',)
+
+    link_cache = {}
+    text_start = 0
+    i = 0
+
+    def flush_text(end : int) -> None:
+        if end > text_start:
+            nodes.append(TextNode(text[text_start:end], text_type))
+
+    while True:
+        match = special_pattern.search(text, i)
+        if match is None:
+            break
+        i = match.start()
+        char = text[i]
+
+        if char == '`':
+            close = text.find('`', i + 1)
+            if close == -1:
+                raise Exception("Invalid markdown delimiter syntax: matching ` character not found")
+            flush_text(i)
+            if close > i + 1:
+                nodes.append(TextNode(text[i + 1:close], TextNodeType.code))
+            i = text_start = close + 1
+
+        elif char == '*':
+            run_end = i
+            while run_end < len(text) and text[run_end] == '*':
+                run_end += 1
+            run_length = run_end - i
+
+            # runs of three or more '*' are neither italic nor bold delimiters
+            if run_length > 2:
+                i = run_end
+                continue
+
+            close = _find_standalone_delimiter(text, run_end, run_length)
+            if close == -1:
+                raise Exception(f"Invalid markdown delimiter syntax: matching {'*' * run_length} character not found")
+            flush_text(i)
+            delimited_type = TextNodeType.italic if run_length == 1 else TextNodeType.bold
+            _scan_inline(text[run_end:close], delimited_type, nodes)
+            i = text_start = close + run_length
+
+        else:
+            is_image = char == '!'
+            bracket = i + 1 if is_image else i
+            if is_image and not text.startswith('[', bracket):
+                i += 1
+                continue
+
+            spans = _match_bracket_url(text, bracket, link_cache, blocking_tokens)
+            if spans is None:
+                # '![' can not open a link either, so both characters are plain text
+                i = bracket + 1
+                continue
+
+            middle, end = spans
+            alt_text = text[bracket + 1:middle]
+            url = text[middle + 2:end]
+            flush_text(i)
+            if not url:
+                warnings.warn("Markdown syntax detected but no content given", UserWarning)
+            elif alt_text:
+                nodes.append(TextNode(alt_text, TextNodeType.image if is_image else TextNodeType.link, url))
+            i = text_start = end + 1
+
+    flush_text(len(text))
+
+
 def text_to_textnode(text : str) -> list[TextNode]:
-    
-    node = TextNode(text, TextNodeType.text)
-    x = split_nodes_delimiter([node], "*", TextNodeType.italic)
-    x = split_nodes_delimiter(x, "**", TextNodeType.bold)
-    x = split_nodes_delimiter(x, "`", TextNodeType.code)
-    x = split_nodes_link(x)
-    x = split_nodes_image(x)
+    """
+    single pass inline scanner, gives the same TextNode stream as chaining
+    split_nodes_delimiter for "*", "**" and "`", split_nodes_link and split_nodes_image e.g.
+
+    text_to_textnode("This is **text** with a [link](https://boot.dev)") == [
+                                                                            TextNode("This is ", TextNodeType.text),
+                                                                            TextNode("text", TextNodeType.bold),
+                                                                            TextNode(" with a ", TextNodeType.text),
+                                                                            TextNode("link", TextNodeType.link, "https://boot.dev"),
+                                                                        ]
+
+    the content of code spans is taken literally, so e.g. a * inside
+    a code span is not treated as an italic delimiter. A * or ** is closed only by a
+    run of exactly as many '*' (runs of three or more are plain text), where the chain
+    only checked that the whole text had an even number of '*': "**a *b* c**" and
+    "*a* ***" are now accepted, "* ***" and "**b*** *" are now rejected
+    """
+    nodes = []
+    with profiling.stage("inline"):
+        _scan_inline(text, TextNodeType.text, nodes)
 
-    return x
+    return nodes
 
 
 def markdown_to_blocks(markdown : str) -> list[str]:
-    # Use regex to split the markdown string by \n\n
-    blocks = re.split(r'\n\s*\n', markdown)
-    
-    # Strip leading and trailing whitespace from each block and filter out any empty blocks
-    processed_blocks = [block.strip() for block in blocks if block.strip()]
-    
-    return processed_blocks
+    """
+    splits the markdown in blocks separated by blank lines, with the surrounding
+    whitespace stripped. Same as scan_markdown_blocks without the classification
+    """
+    return [block.text for block in scan_markdown_blocks(markdown)]
 
 
-def block_to_block_type(block : str) -> MDBlockType:
+_heading_pattern = re.compile(r'#{1,6} ')
+_ordered_list_pattern = re.compile(r'(\d+)\. ')
 
-    if re.match(r'#{1,6} ', block):
+
+def classify_block_lines(lines : list[str]) -> MDBlockType:
+    """
+    returns the type of the block made of 'lines' (already stripped as a whole),
+    checking each line at most once
+    """
+    first_line = lines[0]
+    if _heading_pattern.match(first_line):
         return MDBlockType.heading
-    
-    if block.startswith('```') and block.endswith('```'):
+
+    if first_line.startswith('```') and lines[-1].endswith('```'):
         return MDBlockType.code
-    
-    if all(line.startswith('> ') for line in block.split('\n')):
+
+    quote = unordered_list = ordered_list = True
+    for number, line in enumerate(lines, 1):
+        if quote and not line.startswith('> '):
+            quote = False
+        if unordered_list and not line.startswith(('* ', '- ')):
+            unordered_list = False
+        if ordered_list:
+            # the numbers must increment by 1 starting from 1
+            match = _ordered_list_pattern.match(line)
+            if match is None or int(match.group(1)) != number:
+                ordered_list = False
+        if not (quote or unordered_list or ordered_list):
+            return MDBlockType.paragraph
+
+    if quote:
         return MDBlockType.quote
-    
-    if all(line.startswith(('* ', '- ')) for line in block.split('\n')):
+    if unordered_list:
         return MDBlockType.unordered_list
-    
-    ordered_list_pattern = r'^(\d+)\. '
-    lines = block.split('\n')
-    if all(re.match(ordered_list_pattern, line) for line in lines):
-        # Check if numbers increment by 1
-        numbers = [int(re.match(ordered_list_pattern, line).group(1)) for line in lines]
-        if numbers == list(range(1, len(lines) + 1)):
-            return MDBlockType.ordered_list
-    
-    
-    return MDBlockType.paragraph
 
+    return MDBlockType.ordered_list
+
+
+def _make_block(lines : list[str], start_line : int) -> MDBlock:
+    # the block is stripped as a whole, so only its first and last lines lose their whitespace
+    stripped_lines = list(lines)
+    stripped_lines[0] = stripped_lines[0].lstrip()
+    stripped_lines[-1] = stripped_lines[-1].rstrip()
+
+    return MDBlock("\n".join(stripped_lines), classify_block_lines(stripped_lines), start_line, start_line + len(lines) - 1)
+
+
+def _split_at_blank_lines(lines : list[str], start_line : int) -> list[MDBlock]:
+    blocks = []
+    current = []
+    for number, line in enumerate(lines, start_line):
+        if line.strip():
+            if not current:
+                current_start = number
+            current.append(line)
+        elif current:
+            blocks.append(_make_block(current, current_start))
+            current = []
+    if current:
+        blocks.append(_make_block(current, current_start))
+
+    return blocks
+
+
+def iter_markdown_blocks(lines : Iterable[str], first_line : int = 1) -> Iterator[MDBlock]:
+    """
+    yields the classified blocks of the markdown made of 'lines' one at a time, as soon as
+    each block ends. 'lines' can be an open file, so that a document is never fully loaded
+    in memory: only the block being read is kept. 'first_line' is the number of the first
+    line in the source file (e.g. after a front matter)
+    """
+    current = []
+    current_start = 0
+    in_fence = False
+
+    for number, line in enumerate(lines, first_line):
+        # lines read from a file keep their newline
+        line = line.rstrip('\n')
+
+        if in_fence:
+            current.append(line)
+            if line.rstrip().endswith('```'):
+                in_fence = False
+            continue
+
+        if not line.strip():
+            if current:
+                yield _make_block(current, current_start)
+                current = []
+            continue
+
+        if not current:
+            current_start = number
+            stripped_line = line.strip()
+            # an opening fence that is not closed on the same line
+            in_fence = stripped_line.startswith('```') and (len(stripped_line) < 6 or not stripped_line.endswith('```'))
+        current.append(line)
+
+    if current:
+        if in_fence:
+            # never closed, blank lines split it as usual
+            yield from _split_at_blank_lines(current, current_start)
+        else:
+            yield _make_block(current, current_start)
+
+
+def scan_markdown_blocks(markdown : str, first_line : int = 1) -> list[MDBlock]:
+    """
+    walks the markdown once, line by line, and returns its blocks already classified e.g.
+
+    scan_markdown_blocks("# a\n\n* b\n* c") == [
+                                                MDBlock("# a", MDBlockType.heading, 1, 1),
+                                                MDBlock("* b\n* c", MDBlockType.unordered_list, 3, 4),
+                                            ]
+
+    blocks are separated by blank (or whitespace only) lines, except inside ``` fences
+    so that code blocks can contain blank lines
+    """
+    return list(iter_markdown_blocks(markdown.split('\n'), first_line))
+
+
+def block_to_block_type(block : str) -> MDBlockType:
+
+    return classify_block_lines(block.split('\n'))
@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from site_generator import generator
+from site_generator.assets import transfer_file
+
+
+def scan_tree(dir_path : str, extension : str = None) -> dict[str, tuple[int, int]]:
+    """
+    returns the (modification time, size) signature of every file under 'dir_path',
+    using os.scandir so that each file costs a single stat call
+    """
+    signatures = {}
+    if not os.path.isdir(dir_path):
+        return signatures
+
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            path = f"{dir_path}/{entry.name}"
+            if entry.is_dir():
+                signatures.update(scan_tree(path, extension))
+            elif extension is None or entry.name.endswith(extension):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # removed while scanning, seen as removed at this poll
+                    continue
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return signatures
+
+
+def diff_signatures(old : dict, new : dict) -> tuple[list[str], list[str]]:
+    """
+    returns the sorted lists of changed (or added) and removed paths between two scan_tree results
+    """
+    changed = sorted(path for path, signature in new.items() if old.get(path) != signature)
+    removed = sorted(path for path in old if path not in new)
+
+    return changed, removed
+
+
+class SiteWatcher:
+    """
+    keeps the page graph (every source with its output) and the signatures of the
+    inputs in memory and, at every poll, re-renders or re-copies only the outputs
+    affected by what changed since the previous poll
+    """
+    def __init__(self,
+                 dir_path_content : str,
+                 static_dir : str,
+                 template_path : str,
+                 dest_dir_path : str,
+                 stream_threshold : int = generator.STREAM_THRESHOLD
+        ) -> None:
+
+        self.dir_path_content = dir_path_content
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir_path = dest_dir_path
+        self.stream_threshold = stream_threshold
+
+        self.pages = {}
+        self.content_signatures = {}
+        self.static_signatures = {}
+        self.template_signature = None
+
+    def page_dest(self, from_path : str) -> str:
+        relative_path = os.path.relpath(from_path, self.dir_path_content)
+        return f"{self.dest_dir_path}/{relative_path}".replace('.md', '.html')
+
+    def static_dest(self, from_path : str) -> str:
+        return f"{self.dest_dir_path}/{os.path.relpath(from_path, self.static_dir)}"
+
+    def template_changed(self) -> bool:
+        """
+        whether the template changed since the last call. A missing template (e.g. while an
+        editor saves it by renaming) is not a change: the pages are rebuilt once it is back
+        """
+        try:
+            stat = os.stat(self.template_path)
+        except OSError as e:
+            if self.template_signature is not None:
+                print(f"Cannot read template '{self.template_path}', waiting for it: {e}")
+            self.template_signature = None
+            return False
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        changed = signature != self.template_signature
+        self.template_signature = signature
+
+        return changed
+
+    def build(self) -> None:
+        """
+        full build, run once when the watcher starts
+        """
+        generator.copy_static_contents(self.static_dir, self.dest_dir_path)
+        self.static_signatures = scan_tree(self.static_dir)
+
+        self.template_changed()
+        self.content_signatures = scan_tree(self.dir_path_content, ".md")
+        self.pages = {from_path : self.page_dest(from_path) for from_path in sorted(self.content_signatures)}
+        generator.generate_pages(list(self.pages.items()), self.template_path, stream_threshold=self.stream_threshold)
+
+    def poll(self) -> int:
+        """
+        rebuilds what changed since the last poll, returns the number of updated outputs
+        """
+        updated = 0
+
+        static_signatures = scan_tree(self.static_dir)
+        changed, removed = diff_signatures(self.static_signatures, static_signatures)
+        self.static_signatures = static_signatures
+        for from_path in changed:
+            try:
+                transfer_file(from_path, self.static_dest(from_path))
+            except OSError as e:
+                # copied again at the next poll, or its output removed if the file is gone
+                print(f"Failed to copy '{from_path}': {e}")
+                self.static_signatures[from_path] = None
+        for from_path in removed:
+            generator.remove_stale_output(self.static_dest(from_path), self.dest_dir_path)
+        updated += len(changed) + len(removed)
+
+        content_signatures = scan_tree(self.dir_path_content, ".md")
+        changed, removed = diff_signatures(self.content_signatures, content_signatures)
+        self.content_signatures = content_signatures
+        for from_path in removed:
+            generator.remove_stale_output(self.pages.pop(from_path), self.dest_dir_path)
+        for from_path in changed:
+            self.pages[from_path] = self.page_dest(from_path)
+
+        # a template change invalidates every page
+        if self.template_changed():
+            changed = sorted(self.pages)
+
+        # a broken page must not stop the watcher, the error is reported and the page is rebuilt at its next change
+        for from_path in changed:
+            try:
+                generator.generate_page(from_path, self.template_path, self.pages[from_path], self.stream_threshold)
+            except Exception as e:
+                print(f"Failed to generate page from '{from_path}': {e}")
+        updated += len(changed) + len(removed)
+
+        return updated
+
+    def watch(self, interval : float = 0.05) -> None:
+        while True:
+            start = time.perf_counter()
+            updated = self.poll()
+            if updated:
+                print(f"Updated {updated} outputs in {(time.perf_counter() - start) * 1000:.1f} ms")
+            time.sleep(interval)
+
+
+def serve(dest_dir_path : str, port : int) -> ThreadingHTTPServer:
+    """
+    serves 'dest_dir_path' on localhost:'port' from a background thread
+    """
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=dest_dir_path)
+    server = ThreadingHTTPServer(("", port), handler)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving '{dest_dir_path}' on http://localhost:{port}")
+
+    return server
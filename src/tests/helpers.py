@@ -0,0 +1,16 @@
+import os
+
+
+# files shared by the tests building sites in temporary directories
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+def write_file(path : str, text : str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def read_file(path : str) -> str:
+    with open(path) as file:
+        return file.read()
@@ -0,0 +1,37 @@
+import unittest
+import tempfile
+
+from site_generator import benchmark
+from site_generator.htmlnode_utils import markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic_and_valid(self):
+        with tempfile.TemporaryDirectory() as root1, tempfile.TemporaryDirectory() as root2:
+            paths1 = benchmark.generate_corpus(root1, pages=5, blocks=10, inline_density=0.5, nesting=3, seed=1)
+            paths2 = benchmark.generate_corpus(root2, pages=5, blocks=10, inline_density=0.5, nesting=3, seed=1)
+
+            for path1, path2 in zip(paths1, paths2):
+                with open(path1) as file1, open(path2) as file2:
+                    markdown = file1.read()
+                    self.assertEqual(markdown, file2.read())
+                markdown_to_html_node(markdown).to_html()
+
+    def test_report(self):
+        report = benchmark.run_benchmark(pages=3, blocks=5, repeat=1)
+
+        self.assertEqual(
+            ["markdown_to_blocks", "block_to_block_type", "scan_markdown_blocks", "text_to_textnode", "markdown_to_html_node", "to_html", "generate_pages_recursive",
+             "generate_pages_minified"],
+            list(report["stages"]),
+        )
+        self.assertGreater(report["pages_per_second"], 0)
+        self.assertGreater(report["minify"]["separate_pass_ms_per_mb"], 0)
+        self.assertGreater(report["minify"]["saved_bytes"], 0)
+
+        changes = benchmark.compare_reports(report, report)
+        self.assertTrue(all(change == 0 for change in changes.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
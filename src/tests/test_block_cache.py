@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+
+from site_generator import block_cache
+from site_generator.block_cache import BlockCache
+from site_generator.htmlnode_utils import markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def tearDown(self):
+        block_cache.disable()
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual("<p>a</p>", cache.get("a"))
+
+        # "b" is now the least recently used
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual("<p>a</p>", cache.get("a"))
+
+        self.assertEqual({"entries" : 2, "hits" : 2, "misses" : 1, "evictions" : 1, "hit_rate" : 2 / 3}, cache.stats())
+
+    def test_persistence_and_merge(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = BlockCache(path=f"{root}/blocks.json")
+            cache.put("a", "<p>a</p>")
+            cache.save()
+
+            loaded = BlockCache(path=f"{root}/blocks.json")
+            self.assertEqual("<p>a</p>", loaded.get("a"))
+
+            worker = BlockCache()
+            worker.record_new_keys = True
+            worker.put("b", "<p>b</p>")
+            worker.get("b")
+            loaded.merge(worker.export_state())
+            self.assertEqual("<p>b</p>", loaded.get("b"))
+            self.assertEqual(3, loaded.hits)
+            self.assertEqual(0, worker.hits)
+
+    def test_new_keys_stay_bounded(self):
+        # the main process never records them
+        cache = BlockCache(max_entries=10)
+        for i in range(1000):
+            cache.put(str(i), "<p></p>")
+        self.assertEqual(0, len(cache._new_keys))
+
+        # a worker forgets the evicted ones
+        worker = BlockCache(max_entries=10)
+        worker.record_new_keys = True
+        for i in range(1000):
+            worker.put(str(i), "<p></p>")
+        self.assertEqual(10, len(worker.export_state()["entries"]))
+
+    def test_markdown_to_html_node(self):
+        markdown = "# a\n\nshared *block*\n\n```code```"
+        expected_html = "<div><h1>a</h1><p>shared <i>block</i></p><pre><code>code</code></pre></div>"
+
+        cache = block_cache.enable()
+        self.assertEqual(expected_html, markdown_to_html_node(markdown).to_html())
+        self.assertEqual(expected_html, markdown_to_html_node(markdown).to_html())
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(3, cache.misses)
+
+
+if __name__ == "__main__":
+    unittest.main()
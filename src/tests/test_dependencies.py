@@ -0,0 +1,38 @@
+import unittest
+
+from site_generator.dependencies import DependencyGraph, local_asset_path, find_image_dependencies
+
+
+class TestDependencies(unittest.TestCase):
+    def test_local_asset_path(self):
+        self.assertEqual("static/images/a.png", local_asset_path("/images/a.png", "public/blog/post.html", "public", "static"))
+        self.assertEqual("static/blog/b.png", local_asset_path("b.png?v=1", "public/blog/post.html", "public", "static"))
+        self.assertIsNone(local_asset_path("https://example.com/a.png", "public/index.html", "public", "static"))
+        self.assertIsNone(local_asset_path("../../a.png", "public/index.html", "public", "static"))
+
+        markdown = "![a](/images/a.png) and ![b](b.png) and again ![a](/images/a.png)"
+        self.assertListEqual(["static/b.png", "static/images/a.png"], find_image_dependencies(markdown, "public/index.html", "public", "static"))
+
+        # the same urls as in the html, code is not rendered as images
+        markdown = "---\ncover: ![x](/x.png)\n---\n![a](/my images/a.png) `![c](/c.png)` [b](/b_(1).css)\n\n```\n![d](/d.png)\n```"
+        self.assertListEqual(["static/my images/a.png"], find_image_dependencies(markdown, "public/index.html", "public", "static"))
+        self.assertListEqual(["static/b_(1", "static/my images/a.png"],
+                             find_image_dependencies(markdown, "public/index.html", "public", "static", links=True))
+
+    def test_transitive_invalidation(self):
+        graph = DependencyGraph({
+            "content/index.md" : ["template.html", "content/blog/post.md"],
+            "content/blog/post.md" : ["template.html", "static/images/a.png"],
+            "content/about.md" : ["template.html"],
+        })
+
+        self.assertDictEqual({
+            "content/blog/post.md" : "'static/images/a.png' changed",
+            "content/index.md" : "'content/blog/post.md' is rebuilt ('static/images/a.png' changed)",
+        }, graph.invalidated({"static/images/a.png" : "changed"}))
+
+        self.assertEqual(3, len(graph.invalidated({"template.html" : "changed"})))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import tempfile
+
+from site_generator import front_matter
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        markdown = "---\ntitle: \"Home page\"\n# a comment\ndate: 2024-05-01\n---\n# Home\n\ntext"
+        self.assertEqual(({"title" : "Home page", "date" : "2024-05-01"}, "# Home\n\ntext", 6), front_matter.split_front_matter(markdown))
+
+        markdown = "+++\ntags = 'a, b'\n+++\n# Home"
+        self.assertEqual(({"tags" : "a, b"}, "# Home", 4), front_matter.split_front_matter(markdown))
+
+        # no front matter, or a delimiter never closed
+        self.assertEqual(({}, "# Home", 1), front_matter.split_front_matter("# Home"))
+        self.assertEqual(({}, "---\n# Home", 1), front_matter.split_front_matter("---\n# Home"))
+
+        with self.assertRaises(Exception):
+            front_matter.split_front_matter("---\nnot a key value\n---\n# Home")
+
+    def test_read_front_matter(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(f"{root}/page.md", "w") as file:
+                file.write("---\ntitle: Home\n---\n" + "# Home\n\n" + "text\n" * 1000)
+
+            self.assertEqual({"title" : "Home"}, front_matter.read_front_matter(f"{root}/page.md", max_chars=100))
+
+            # the front matter does not fit in the bounded read
+            with self.assertRaises(Exception):
+                front_matter.read_front_matter(f"{root}/page.md", max_chars=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
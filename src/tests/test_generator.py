@@ -0,0 +1,388 @@
+import unittest
+import io
+import os
+import tempfile
+import contextlib
+
+from site_generator import generator
+from site_generator import assets
+from site_generator.manifest import BuildManifest
+from site_generator.watch import SiteWatcher
+from tests.helpers import TEMPLATE, write_file, read_file
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = f"{self.root}/content"
+        self.static = f"{self.root}/static"
+        self.public = f"{self.root}/public"
+        self.template = f"{self.root}/template.html"
+        self.manifest_path = f"{self.root}/cache/manifest.json"
+
+        write_file(self.template, TEMPLATE)
+        write_file(f"{self.content}/index.md", "# Home\n\nhello")
+        write_file(f"{self.content}/blog/post.md", "# Post\n\nworld")
+        write_file(f"{self.static}/index.css", "body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self) -> tuple[int, int]:
+        manifest = BuildManifest(self.manifest_path)
+        copied = generator.sync_static_contents(self.static, self.public, manifest)
+        rendered = generator.generate_pages_incremental(self.content, self.template, self.public, manifest)
+        manifest.save()
+        return rendered, copied
+
+    def test_only_changed_inputs_are_rebuilt(self):
+        self.assertEqual((2, 1), self.build())
+        self.assertEqual("<title>Post</title><body><div><h1>Post</h1><p>world</p></div></body>",
+                         read_file(f"{self.public}/blog/post.html"))
+
+        # nothing changed
+        self.assertEqual((0, 0), self.build())
+
+        # a single page changed
+        write_file(f"{self.content}/index.md", "# Home\n\nhello again")
+        self.assertEqual((1, 0), self.build())
+        self.assertIn("hello again", read_file(f"{self.public}/index.html"))
+
+        # a template change invalidates every page
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual((2, 0), self.build())
+
+        # a deleted output is regenerated
+        os.remove(f"{self.public}/index.css")
+        self.assertEqual((0, 1), self.build())
+
+    def test_deleted_sources_remove_outputs(self):
+        self.build()
+
+        os.remove(f"{self.content}/blog/post.md")
+        os.remove(f"{self.static}/index.css")
+        self.assertEqual((0, 0), self.build())
+
+        self.assertFalse(os.path.exists(f"{self.public}/blog"))
+        self.assertFalse(os.path.exists(f"{self.public}/index.css"))
+        self.assertTrue(os.path.exists(f"{self.public}/index.html"))
+
+    def test_linked_images_invalidate_pages(self):
+        write_file(f"{self.content}/blog/post.md", "# Post\n\n![pic](/images/pic.png)")
+        write_file(f"{self.static}/images/pic.png", "v1")
+
+        def build_pages() -> int:
+            manifest = BuildManifest(self.manifest_path)
+            rendered = generator.generate_pages_incremental(self.content, self.template, self.public, manifest, static_dir=self.static)
+            manifest.save()
+            return rendered
+
+        self.assertEqual(2, build_pages())
+        self.assertEqual(0, build_pages())
+
+        # only the page linking the image depends on it
+        write_file(f"{self.static}/images/pic.png", "v2")
+        self.assertEqual(1, build_pages())
+        self.assertEqual(0, build_pages())
+
+        os.remove(f"{self.static}/images/pic.png")
+        self.assertEqual(1, build_pages())
+
+    def test_static_sync(self):
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(1, generator.sync_static_contents(self.static, self.public, manifest, check_hash=True))
+        write_file(f"{self.public}/index.html", "generated page")
+
+        # same size and mtime, nothing is copied and the generated page survives
+        self.assertEqual(0, generator.sync_static_contents(self.static, self.public, manifest))
+        self.assertEqual("generated page", read_file(f"{self.public}/index.html"))
+
+        # a newer mtime with the same content is skipped only when hashes are checked
+        stat = os.stat(f"{self.static}/index.css")
+        os.utime(f"{self.static}/index.css", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(0, generator.sync_static_contents(self.static, self.public, manifest, check_hash=True))
+        os.utime(f"{self.static}/index.css", ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+        self.assertEqual(1, generator.sync_static_contents(self.static, self.public, manifest))
+
+        write_file(f"{self.static}/images/logo.svg", "<svg></svg>")
+        self.assertEqual(1, generator.sync_static_contents(self.static, self.public, manifest, link=True))
+        self.assertTrue(os.path.samefile(f"{self.static}/images/logo.svg", f"{self.public}/images/logo.svg"))
+
+
+class TestParallelBuild(unittest.TestCase):
+    def test_parallel_matches_serial_output(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            for i in range(6):
+                write_file(f"{root}/content/dir{i % 2}/page{i}.md", f"# Page {i}\n\n*text* {i}")
+
+            generator.generate_pages_parallel(f"{root}/content", f"{root}/template.html", f"{root}/parallel", 3)
+            generator.generate_pages(
+                [(f, d.replace('.md', '.html')) for f, d in generator.find_files(f"{root}/content", f"{root}/serial", ".md")],
+                f"{root}/template.html",
+            )
+
+            parallel_files = generator.find_files(f"{root}/parallel", f"{root}/serial")
+            self.assertEqual(6, len(parallel_files))
+            for parallel_path, serial_path in parallel_files:
+                self.assertEqual(read_file(serial_path), read_file(parallel_path))
+
+    def test_failing_page_is_reported(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/good.md", "# Good")
+            write_file(f"{root}/content/bad.md", "no header here")
+            write_file(f"{root}/content/other.md", "# Other")
+
+            with self.assertRaises(Exception) as e:
+                generator.generate_pages_parallel(f"{root}/content", f"{root}/template.html", f"{root}/public", 2)
+            self.assertIn(f"{root}/content/bad.md", str(e.exception))
+
+
+class TestOutputWrites(unittest.TestCase):
+    def test_unchanged_outputs_are_not_rewritten(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/index.md", "# Home\n\nhello")
+            write_file(f"{root}/content/blog/post.md", "# Post\n\n" + "* item\n" * 100)
+            pages = generator.find_files(f"{root}/content", f"{root}/public", ".md")
+
+            self.assertEqual(2, generator.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/public"))
+            os.utime(f"{root}/public/index.html", ns=(0, 0))
+            os.utime(f"{root}/public/blog/post.html", ns=(0, 0))
+
+            # in memory, streamed, parallel and asynchronous writes
+            self.assertFalse(generator.generate_page(f"{root}/content/index.md", f"{root}/template.html", f"{root}/public/index.md"))
+            self.assertFalse(generator.generate_page(f"{root}/content/blog/post.md", f"{root}/template.html", f"{root}/public/blog/post.md",
+                                                     stream_threshold=0))
+            generator.generate_pages(pages, f"{root}/template.html", jobs=2)
+            generator.generate_pages(pages, f"{root}/template.html", io_limit=2)
+            self.assertEqual(0, os.stat(f"{root}/public/index.html").st_mtime_ns)
+            self.assertEqual(0, os.stat(f"{root}/public/blog/post.html").st_mtime_ns)
+            self.assertEqual(["index.html", "blog"], sorted(os.listdir(f"{root}/public"), reverse=True))
+
+            write_file(f"{root}/content/index.md", "# Home\n\nhello again")
+            self.assertEqual(1, generator.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/public"))
+            self.assertNotEqual(0, os.stat(f"{root}/public/index.html").st_mtime_ns)
+            self.assertEqual(0, os.stat(f"{root}/public/blog/post.html").st_mtime_ns)
+
+
+    def test_failed_write_leaves_no_tmp_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            # a directory in the way of the output makes the rename fail
+            os.makedirs(f"{root}/asset-manifest.json")
+            with self.assertRaises(OSError):
+                assets.write_if_changed(f"{root}/asset-manifest.json", "{}")
+            self.assertEqual(["asset-manifest.json"], os.listdir(root))
+
+    def test_default_build_keeps_page_outputs(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/blog/post.md", "# Post\n\nworld")
+            write_file(f"{root}/static/index.css", "body {}")
+            write_file(f"{root}/public/stale.html", "old")
+            write_file(f"{root}/public/old/page.html", "old")
+
+            keep = generator.page_outputs(f"{root}/content", f"{root}/public")
+            self.assertEqual({os.path.normpath(f"{root}/public/blog/post.html")}, keep)
+            generator.copy_static_contents(f"{root}/static", f"{root}/public", keep)
+            self.assertEqual(1, generator.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/public"))
+            os.utime(f"{root}/public/blog/post.html", ns=(0, 0))
+
+            # everything but the pages is erased, the unchanged page is not rewritten
+            generator.copy_static_contents(f"{root}/static", f"{root}/public", keep)
+            self.assertEqual(["blog", "index.css"], sorted(os.listdir(f"{root}/public")))
+            self.assertEqual(0, generator.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/public"))
+            self.assertEqual(0, os.stat(f"{root}/public/blog/post.html").st_mtime_ns)
+
+
+class TestFingerprinting(unittest.TestCase):
+    def tearDown(self):
+        assets.disable_fingerprints()
+
+    def test_urls_point_to_hashed_copies(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", '<link href="/index.css">{{ Content }}')
+            write_file(f"{root}/static/index.css", "body {}")
+            write_file(f"{root}/static/images/a.png", "png")
+            write_file(f"{root}/content/index.md", "# Home\n\n![a](/images/a.png) [css](/index.css?v=1) [out](https://example.com/index.css)")
+
+            manifest = BuildManifest(f"{root}/manifest.json")
+            generator.copy_static_contents(f"{root}/static", f"{root}/public")
+            urls = generator.fingerprint_static_contents(f"{root}/static", f"{root}/public", manifest)
+            css_url = urls["/index.css"]
+            self.assertRegex(css_url, r"^/index\.[0-9a-f]{10}\.css$")
+            self.assertEqual("body {}", read_file(f"{root}/public{css_url}"))
+
+            assets.enable_fingerprints(urls)
+            generator.generate_page(f"{root}/content/index.md", f"{root}/template.html", f"{root}/public/index.md")
+            self.assertEqual(
+                f'<link href="{css_url}"><div><h1>Home</h1><p><img src="{urls["/images/a.png"]}" alt="a">a</img> '
+                f'<a href="{css_url}?v=1">css</a> <a href="https://example.com/index.css">out</a></p></div>',
+                read_file(f"{root}/public/index.html"),
+            )
+
+            # only the changed file gets a new copy, the old one is removed
+            write_file(f"{root}/static/index.css", "p {}")
+            generator.copy_static_contents(f"{root}/static", f"{root}/public")
+            write_file(f"{root}/public{css_url}", "body {}")
+            new_urls = generator.fingerprint_static_contents(f"{root}/static", f"{root}/public", manifest)
+            self.assertNotEqual(css_url, new_urls["/index.css"])
+            self.assertEqual(urls["/images/a.png"], new_urls["/images/a.png"])
+            self.assertFalse(os.path.exists(f"{root}/public{css_url}"))
+
+
+    def test_explain_names_the_changed_template(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", "{{ Content }}")
+            write_file(f"{root}/static/index.css", "body {}")
+            write_file(f"{root}/content/index.md", "# Home")
+
+            def explain() -> str:
+                manifest = BuildManifest(f"{root}/manifest.json")
+                assets.enable_fingerprints(generator.fingerprint_static_contents(f"{root}/static", f"{root}/public", manifest))
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    generator.generate_pages_incremental(f"{root}/content", f"{root}/template.html", f"{root}/public", manifest,
+                                                         static_dir=f"{root}/static", explain=True)
+                manifest.save()
+                return output.getvalue()
+
+            explain()
+            # the template now links the stylesheet, which becomes a dependency of the page
+            write_file(f"{root}/template.html", '<link href="/index.css">{{ Content }}')
+            self.assertIn(f"Rebuilding '{root}/content/index.md': '{root}/template.html' changed", explain())
+
+
+class TestAsyncBuild(unittest.TestCase):
+    def test_async_matches_serial_output(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            for i in range(8):
+                write_file(f"{root}/content/dir{i % 2}/page{i}.md", f"# Page {i}\n\n*text* {i}")
+
+            pages = generator.find_files(f"{root}/content", f"{root}/async", ".md")
+            self.assertEqual(8, generator.generate_pages_async(pages, f"{root}/template.html", io_limit=3))
+            # every page streamed by the rendering worker
+            generator.generate_pages(generator.find_files(f"{root}/content", f"{root}/async_stream", ".md"), f"{root}/template.html",
+                                     stream_threshold=0, io_limit=3)
+            generator.generate_pages(generator.find_files(f"{root}/content", f"{root}/serial", ".md"), f"{root}/template.html")
+
+            for output_dir in ["async", "async_stream"]:
+                output_files = generator.find_files(f"{root}/{output_dir}", f"{root}/serial")
+                self.assertEqual(8, len(output_files))
+                for output_path, serial_path in output_files:
+                    self.assertEqual(read_file(serial_path), read_file(output_path))
+
+    def test_failing_page_is_reported(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/good.md", "# Good")
+            write_file(f"{root}/content/bad.md", "no header here")
+
+            with self.assertRaises(Exception) as e:
+                generator.generate_pages_async(generator.find_files(f"{root}/content", f"{root}/public", ".md"), f"{root}/template.html")
+            self.assertIn(f"{root}/content/bad.md", str(e.exception))
+
+
+class TestStreamingBuild(unittest.TestCase):
+    def test_streamed_page_matches_in_memory_page(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            markdown = "intro\n\n# Big page\n\n```\ncode\n\nblock\n```\n\n" + "* item **bold**\n* item\n\n" * 50
+            write_file(f"{root}/content/big.md", markdown)
+
+            generator.generate_page(f"{root}/content/big.md", f"{root}/template.html", f"{root}/memory/big.md", stream_threshold=None)
+            generator.generate_page(f"{root}/content/big.md", f"{root}/template.html", f"{root}/stream/big.md", stream_threshold=0)
+
+            self.assertEqual(read_file(f"{root}/memory/big.html"), read_file(f"{root}/stream/big.html"))
+            self.assertIn("<title>Big page</title>", read_file(f"{root}/stream/big.html"))
+
+    def test_front_matter_placeholders(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", "{{ Title }} by {{ author }}{{ Content }}")
+            write_file(f"{root}/content/page.md", "---\nauthor: Me\nTitle: ignored\n---\n# Page\n\ntext")
+
+            for stream_threshold in [None, 0]:
+                generator.generate_page(f"{root}/content/page.md", f"{root}/template.html", f"{root}/public/page.md", stream_threshold)
+                self.assertEqual("Page by Me<div><h1>Page</h1><p>text</p></div>", read_file(f"{root}/public/page.html"))
+
+            self.assertEqual([(f"{root}/content/page.md", {"author" : "Me", "Title" : "ignored"})], generator.read_site_metadata(f"{root}/content"))
+
+    def test_streamed_page_needs_single_header(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/two.md", "# One\n\ntext\n\n# Two")
+
+            with self.assertRaises(Exception):
+                generator.generate_page_streaming(f"{root}/content/two.md", f"{root}/template.html", f"{root}/public/two.md")
+            # nothing is left behind by the failed page
+            self.assertEqual([], os.listdir(f"{root}/public"))
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def touch(self, path : str, text : str) -> None:
+        # bump the modification time so that the change is seen even on coarse grained filesystems
+        write_file(path, text)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_poll_rebuilds_only_changes(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/index.md", "# Home")
+            write_file(f"{root}/content/blog/post.md", "# Post")
+            write_file(f"{root}/static/index.css", "body {}")
+
+            watcher = SiteWatcher(f"{root}/content", f"{root}/static", f"{root}/template.html", f"{root}/public")
+            watcher.build()
+            self.assertEqual(0, watcher.poll())
+
+            self.touch(f"{root}/content/blog/post.md", "# Post\n\nedited")
+            self.assertEqual(1, watcher.poll())
+            self.assertIn("<p>edited</p>", read_file(f"{root}/public/blog/post.html"))
+
+            self.touch(f"{root}/template.html", "{{ Content }}")
+            self.assertEqual(2, watcher.poll())
+            self.assertEqual("<div><h1>Home</h1></div>", read_file(f"{root}/public/index.html"))
+
+            os.remove(f"{root}/content/blog/post.md")
+            self.touch(f"{root}/static/index.css", "p {}")
+            self.assertEqual(2, watcher.poll())
+            self.assertFalse(os.path.exists(f"{root}/public/blog"))
+            self.assertEqual("p {}", read_file(f"{root}/public/index.css"))
+
+            # a broken page is reported without stopping the watcher
+            self.touch(f"{root}/content/index.md", "no header")
+            self.assertEqual(1, watcher.poll())
+
+    def test_missing_inputs_are_retried(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/content/index.md", "# Home")
+            write_file(f"{root}/static/index.css", "body {}")
+
+            watcher = SiteWatcher(f"{root}/content", f"{root}/static", f"{root}/template.html", f"{root}/public")
+            watcher.build()
+
+            # a template moved away does not stop the watcher, the pages are rebuilt once it is back
+            os.rename(f"{root}/template.html", f"{root}/template.old")
+            self.assertEqual(0, watcher.poll())
+            os.rename(f"{root}/template.old", f"{root}/template.html")
+            self.touch(f"{root}/template.html", "{{ Content }}")
+            self.assertEqual(1, watcher.poll())
+            self.assertEqual("<div><h1>Home</h1></div>", read_file(f"{root}/public/index.html"))
+
+            # a static file that can not be copied is copied again at the next poll
+            os.remove(f"{root}/public/index.css")
+            os.mkdir(f"{root}/public/index.css")
+            self.touch(f"{root}/static/index.css", "p {}")
+            watcher.poll()
+            os.rmdir(f"{root}/public/index.css")
+            self.assertEqual(1, watcher.poll())
+            self.assertEqual("p {}", read_file(f"{root}/public/index.css"))
+
+
+if __name__ == "__main__":
+    unittest.main()
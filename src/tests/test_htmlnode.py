@@ -1,8 +1,10 @@
 import unittest
 import os
+import io
 
 from site_generator.htmlnode import HTMLNode, LeafNode, ParentNode
 from site_generator import htmlnode_utils
+from site_generator.textnode import MDBlock, MDBlockType
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -18,6 +20,22 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual("", node1.props_to_html())
         self.assertEqual(" href=\"https://www.google.com\" target=\"_blank\"", node2.props_to_html())
 
+        # values are escaped, whatever the shape of the props
+        link = LeafNode("a", "x", {"href" : "/search?q=\"a\"&b=<c>"})
+        image = LeafNode("img", "", {"src" : "a.png", "alt" : "a \"quoted\" alt"})
+        self.assertEqual("<a href=\"/search?q=&quot;a&quot;&amp;b=&lt;c&gt;\">x</a>", link.to_html())
+        self.assertEqual("<img src=\"a.png\" alt=\"a &quot;quoted&quot; alt\"></img>", image.to_html())
+        self.assertEqual(" id=\"it&#x27;s\" class=\"a\"", HTMLNode(props={"id" : "it's", "class" : "a"}).props_to_html())
+        # non string values are rendered as before the fast paths
+        self.assertEqual("<img src=\"a.png\" alt=\"None\"></img>", LeafNode("img", "", {"src" : "a.png", "alt" : None}).to_html())
+        self.assertEqual("<a href=\"1\">x</a>", LeafNode("a", "x", {"href" : 1}).to_html())
+
+        parent = ParentNode("div", [link], {"class" : "note"})
+        self.assertEqual("<div class=\"note\"><a href=\"/search?q=&quot;a&quot;&amp;b=&lt;c&gt;\">x</a></div>", parent.to_html())
+        stream = io.StringIO()
+        parent.write_html(stream)
+        self.assertEqual(parent.to_html(), stream.getvalue())
+
         repr_string1 = "(HTMLNode type)" + \
                         " tag: None" + \
                         " value: None" + \
@@ -108,6 +126,26 @@ class TestParentNode(unittest.TestCase):
             parent3.to_html()
             parent4.to_html()
 
+    def test_streaming(self):
+        parent = ParentNode(
+                "div",
+                [
+                    ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, "Normal text")]),
+                    LeafNode("a", "link", {"href": "https://www.google.com"}),
+                ],
+        )
+
+        expected_string = "<div><p><b>Bold text</b>Normal text</p><a href=\"https://www.google.com\">link</a></div>"
+
+        buffer = io.StringIO()
+        parent.write_html(buffer)
+
+        self.assertEqual(expected_string, buffer.getvalue())
+        self.assertEqual(expected_string, "".join(parent.iter_html()))
+        self.assertEqual(["<div>", "<p>", "<b>Bold text</b>"], list(parent.iter_html())[:3])
+        with self.assertRaises(ValueError):
+            ParentNode("p", children=None).write_html(io.StringIO())
+
 
 class TestHTMLNodeUtils(unittest.TestCase):
     def test_blocks_to_html(self):
@@ -166,6 +204,42 @@ class TestHTMLNodeUtils(unittest.TestCase):
         self.assertEqual("<p>a</p>", paragraph_node.to_html())
 
     
+    def test_typed_blocks_to_html(self):
+
+        heading = MDBlock("## a", MDBlockType.heading)
+        self.assertEqual("<h2>a</h2>", htmlnode_utils.heading_block_to_html_node(heading).to_html())
+
+        with self.assertRaises(Exception):
+            htmlnode_utils.paragraph_block_to_html_node(heading)
+
+
+    def test_markdown_to_document(self):
+
+        document = htmlnode_utils.markdown_to_document("# Title\n\ntext\n\n## Section\n\n### Sub *a*")
+
+        self.assertEqual("Title", document.title)
+        self.assertListEqual([(1, "Title", 1), (2, "Section", 5), (3, "Sub *a*", 7)], document.headings)
+        self.assertEqual("<div><h1>Title</h1><p>text</p><h2>Section</h2><h3>Sub <i>a</i></h3></div>", document.html_node.to_html())
+
+        with self.assertRaises(Exception):
+            htmlnode_utils.markdown_to_document("# One\n\n# Two").title
+
+
+
+    def test_block_urls(self):
+
+        paragraph = MDBlock("`[code](/a)` *see\n[b](/no such)* and\n![c](/c_(x).png)", MDBlockType.paragraph, 5, 7)
+        self.assertListEqual([("/no such", 6, "link"), ("/c_(x", 7, "image")], htmlnode_utils.block_urls(paragraph))
+
+        items = MDBlock("1. [a](/a)\n2. ![b](/b)", MDBlockType.ordered_list, 3, 4)
+        self.assertListEqual([("/a", 3, "link"), ("/b", 4, "image")], htmlnode_utils.block_urls(items))
+
+        quote = MDBlock("> \n> [a](/a)", MDBlockType.quote, 9, 10)
+        self.assertListEqual([("/a", 10, "link")], htmlnode_utils.block_urls(quote))
+
+        code = MDBlock("```\n[a](/a)\n```", MDBlockType.code, 1, 3)
+        self.assertListEqual([], htmlnode_utils.block_urls(code))
+    
     def test_markdown_to_html_node(self):
 
         asset_path = os.path.join(os.path.dirname(__file__), 'assets', 'test_md2.txt')
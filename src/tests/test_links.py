@@ -0,0 +1,35 @@
+import unittest
+import tempfile
+
+from site_generator import links
+from site_generator import generator
+from tests.helpers import TEMPLATE, write_file
+
+
+class TestLinks(unittest.TestCase):
+    def test_broken_links_are_reported_with_their_line(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", TEMPLATE)
+            write_file(f"{root}/static/images/a.png", "png")
+            write_file(f"{root}/content/index.md", "# Home\n\n[post](/blog/post) [about](/about)\n![a](/images/a.png)\n\n[my page](/no such) [a](/missing_(x))")
+            write_file(f"{root}/content/blog/post.md", (
+                "---\nauthor: Me\n---\n# Post\n\n"
+                "[home](../index.html) [out](https://example.com) [top](#top)\n\n"
+                "`[code](/nowhere)`\n\n```\n[code](/nowhere)\n```\n\n"
+                "* ![b](b.png)"
+            ))
+
+            generator.copy_static_contents(f"{root}/static", f"{root}/public")
+            generator.generate_pages_recursive(f"{root}/content", f"{root}/template.html", f"{root}/public")
+
+            self.assertListEqual([
+                (f"{root}/content/blog/post.md", 14, "b.png", "image"),
+                (f"{root}/content/index.md", 3, "/about", "link"),
+                # like in the html, the url ends at the first ')'
+                (f"{root}/content/index.md", 6, "/missing_(x", "link"),
+                (f"{root}/content/index.md", 6, "/no such", "link"),
+            ], links.check_links(f"{root}/content", f"{root}/public"))
+
+
+if __name__ == "__main__":
+    unittest.main()
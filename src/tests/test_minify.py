@@ -0,0 +1,56 @@
+import unittest
+import tempfile
+
+from site_generator import generator
+from site_generator import minify
+from site_generator.template import Template
+from site_generator.manifest import BuildManifest
+from tests.helpers import write_file, read_file
+
+
+class TestMinify(unittest.TestCase):
+    def tearDown(self):
+        minify.disable()
+
+    def test_minify_html(self):
+        self.assertEqual("first line second line", minify.collapse_whitespace("first line\nsecond  line"))
+        self.assertEqual(
+            '<!DOCTYPE html><html><head><title>T</title></head><body><p>a <b>b</b> c</p><pre>  keep\n\n  this</pre><!--[if IE]>x<![endif]--></body></html>',
+            minify.minify_html('<!DOCTYPE html>\n<html>\n<head>\n    <title> T </title>\n</head>\n<!-- comment -->\n<body>\n'
+                               '  <p>a  <b>b</b>\n c</p>\n  <pre>  keep\n\n  this</pre>\n<!--[if IE]>x<![endif]-->\n</body>\n</html>\n'),
+        )
+        # a placeholder inside a <pre> splits it across two literal segments
+        self.assertEqual("<div><pre>\n  ", minify.minify_html("<div>\n<pre>\n  "))
+
+    def test_minified_template(self):
+        template = Template("<body>\n    <article>\n        {{ Content }}\n    </article>\n</body>\n")
+        self.assertIs(template, minify.minified_template(template))
+
+        minify.enable()
+        minified = minify.minified_template(template)
+        self.assertIs(minified, minify.minified_template(template))
+        self.assertEqual("<body><article>x</article></body>", minified.render({"Content" : "x"}))
+
+    def test_minified_build_keeps_code_blocks(self):
+        with tempfile.TemporaryDirectory() as root:
+            write_file(f"{root}/template.html", "<html>\n  <title> {{ Title }} </title>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+            write_file(f"{root}/content/index.md", "# Home\n\nsome  text\nover *two\nlines* and `inline  code`\n\n```\ndef f():\n    return  1\n```")
+            manifest = BuildManifest(f"{root}/manifest.json")
+
+            minify.enable()
+            self.assertEqual(1, generator.generate_pages_incremental(f"{root}/content", f"{root}/template.html", f"{root}/public", manifest))
+            self.assertEqual(
+                "<html><title>Home</title><body><div><h1>Home</h1><p>some text over <i>two lines</i> and <code>inline  code</code></p>"
+                "<pre><code>def f():\n    return  1</code></pre></div></body></html>",
+                read_file(f"{root}/public/index.html"),
+            )
+            self.assertEqual(0, generator.generate_pages_incremental(f"{root}/content", f"{root}/template.html", f"{root}/public", manifest))
+
+            # turning the minification off rebuilds the pages
+            minify.disable()
+            self.assertEqual(1, generator.generate_pages_incremental(f"{root}/content", f"{root}/template.html", f"{root}/public", manifest))
+            self.assertIn("some  text\nover", read_file(f"{root}/public/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import os
+import tempfile
+
+from site_generator import parse_cache
+from site_generator import generator
+from site_generator.parse_cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def tearDown(self):
+        parse_cache.disable()
+
+    def test_pages_are_parsed_once(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = parse_cache.enable(f"{root}/cache")
+            markdown = "---\nauthor: Me\n---\n# Home\n\n*text*"
+
+            metadata, document = generator.parse_page(markdown)
+            self.assertEqual(1, cache.misses)
+
+            cached_metadata, cached_document = generator.parse_page(markdown)
+            self.assertEqual(1, cache.hits)
+            self.assertEqual(metadata, cached_metadata)
+            self.assertEqual(document.headings, cached_document.headings)
+            self.assertEqual("Home", cached_document.title)
+            self.assertEqual("<div><h1>Home</h1><p><i>text</i></p></div>", cached_document.html_node.to_html())
+
+    def test_prune_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache = ParseCache(f"{root}/cache", max_bytes=0)
+            for i, markdown in enumerate(["a", "b", "c"]):
+                cache.put(markdown, {}, [], f"<p>{markdown}</p>")
+                entry_path = cache.entry_path(parse_cache.page_key(markdown))
+                os.utime(entry_path, ns=(i, i))
+            entry_size = os.path.getsize(entry_path)
+
+            # "a" becomes the most recently used
+            self.assertIsNotNone(cache.get("a"))
+            cache.max_bytes = entry_size
+            with open(f"{root}/cache/.DS_Store", "w") as file:
+                file.write("stray")
+            self.assertEqual(2, cache.prune())
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
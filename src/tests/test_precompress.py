@@ -0,0 +1,40 @@
+import unittest
+import os
+import gzip
+import tempfile
+
+from site_generator import generator
+from site_generator.manifest import BuildManifest
+from tests.helpers import write_file
+
+
+class TestPrecompress(unittest.TestCase):
+    def test_compressed_siblings(self):
+        with tempfile.TemporaryDirectory() as root:
+            big_page = "<p>text</p>" * 200
+            write_file(f"{root}/public/index.html", big_page)
+            write_file(f"{root}/public/small.css", "p {}")
+            write_file(f"{root}/public/image.png", "png" * 1000)
+            manifest = BuildManifest(f"{root}/manifest.json")
+
+            self.assertEqual(1, generator.compress_outputs(f"{root}/public", manifest, ["gz"], min_size=100))
+            with gzip.open(f"{root}/public/index.html.gz", "rt") as file:
+                self.assertEqual(big_page, file.read())
+            # too small, or already compressed
+            self.assertFalse(os.path.exists(f"{root}/public/small.css.gz"))
+            self.assertFalse(os.path.exists(f"{root}/public/image.png.gz"))
+
+            # rewritten with the same content
+            write_file(f"{root}/public/index.html", big_page)
+            self.assertEqual(0, generator.compress_outputs(f"{root}/public", manifest, ["gz"], min_size=100, jobs=2))
+
+            write_file(f"{root}/public/index.html", big_page + "<p>more</p>")
+            self.assertEqual(1, generator.compress_outputs(f"{root}/public", manifest, ["gz"], min_size=100, jobs=2))
+
+            os.remove(f"{root}/public/index.html")
+            self.assertEqual(0, generator.compress_outputs(f"{root}/public", manifest, ["gz"], min_size=100))
+            self.assertFalse(os.path.exists(f"{root}/public/index.html.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import json
+import os
+import tempfile
+
+from site_generator import profiling
+from site_generator import generator
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.disable()
+
+    def test_disabled_is_a_no_op(self):
+        profiling.disable()
+        with profiling.stage("parse"):
+            profiling.count("pages", 1)
+        self.assertIsNone(profiling.active())
+
+    def test_stages_and_trace(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(f"{root}/template.html", "w") as file:
+                file.write("{{ Title }}{{ Content }}")
+            with open(f"{root}/index.md", "w") as file:
+                file.write("# Home\n\nsome *text*")
+
+            profiler = profiling.enable(trace=True)
+            generator.generate_page(f"{root}/index.md", f"{root}/template.html", f"{root}/public/index.html")
+
+            for stage in ["page", "read", "parse", "blocks", "inline", "serialize"]:
+                self.assertIn(stage, profiler.stages)
+
+            # nested stages are not counted in the self time of their parent
+            calls, total, self_time = profiler.stages["page"]
+            self.assertEqual(1, calls)
+            self.assertLess(self_time, total)
+
+            self.assertEqual(os.path.getsize(f"{root}/index.md"), profiler.counters["bytes_read"])
+            self.assertEqual(os.path.getsize(f"{root}/public/index.html"), profiler.counters["bytes_written"])
+            self.assertEqual([f"{root}/index.md"], list(profiler.page_times))
+
+            state = profiler.export_state()
+            self.assertEqual({}, profiler.stages)
+            profiler.merge(state)
+            profiler.merge(state)
+            self.assertEqual(2, profiler.stages["page"][0])
+
+            profiler.export_chrome_trace(f"{root}/trace.json")
+            with open(f"{root}/trace.json") as file:
+                trace = json.load(file)
+            self.assertEqual(len(profiler.events), len(trace["traceEvents"]))
+            self.assertIn("Slowest 1 pages", profiler.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
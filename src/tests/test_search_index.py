@@ -0,0 +1,96 @@
+import unittest
+import os
+import tempfile
+
+from site_generator import search_index
+from site_generator.search_index import SearchIndex, build_search_index, page_terms, tokenize, term_shard
+from tests.helpers import write_file, read_file
+
+
+class TestSearchIndex(unittest.TestCase):
+    def test_page_terms(self):
+        self.assertEqual(["the", "lord", "of", "the", "rings", "1954"], tokenize("The Lord of the Rings, 1954"))
+        self.assertEqual(("Home", {"home" : [0, 2], "hello" : [1]}), page_terms("# Home\n\nHello *home*"))
+        # front matter, block syntax, urls and code blocks are not indexed, link texts and alt texts are
+        self.assertEqual(
+            ("Home", {"home" : [0], "quoted" : [1], "item" : [2, 4], "one" : [3], "two" : [5], "text" : [6], "alt" : [7]}),
+            page_terms("---\ntitle: x\n---\n# Home\n\n> quoted\n\n* item one\n* item two\n\n```\ncode\n```\n\n"
+                       "[text](https://example.com/url) ![alt](/image.png)"),
+        )
+        self.assertTrue(all(0 <= term_shard(term, 7) < 7 for term in ["a", "tolkien", "été"]))
+        # the reference FNV-1a hash of "a"
+        self.assertEqual(0xe40c292c, term_shard("a", 1 << 32))
+
+    def test_incremental_index(self):
+        with tempfile.TemporaryDirectory() as root:
+            state_path = f"{root}/cache/search.json"
+            write_file(f"{root}/content/index.md", "# Tolkien Fan Club\n\nI like Tolkien")
+            write_file(f"{root}/content/majesty/index.md", "# The Majesty\n\n**Tolkien** wrote it")
+            write_file(f"{root}/content/other.md", "# Other\n\nnothing")
+
+            self.assertEqual((3, 0), build_search_index(f"{root}/content", f"{root}/public", state_path, shards=4))
+            index = SearchIndex(f"{root}/public", state_path, shards=4)
+            self.assertEqual([("/", [0, 5]), ("/majesty/", [2])], index.lookup("Tolkien"))
+            self.assertEqual([("/other.html", [0])], index.lookup("other"))
+            self.assertEqual(4, len([name for name in os.listdir(f"{root}/public/search") if name.startswith("terms-")]))
+
+            # nothing changed, nothing is rewritten
+            mtimes = {name : os.stat(f"{root}/public/search/{name}").st_mtime_ns for name in os.listdir(f"{root}/public/search")}
+            self.assertEqual((0, 0), build_search_index(f"{root}/content", f"{root}/public", state_path, shards=4))
+
+            # a changed page keeps its id, a removed page disappears
+            write_file(f"{root}/content/index.md", "# Tolkien Fan Club\n\nI like Bilbo")
+            os.remove(f"{root}/content/other.md")
+            self.assertEqual((1, 1), build_search_index(f"{root}/content", f"{root}/public", state_path, shards=4))
+            index = SearchIndex(f"{root}/public", state_path, shards=4)
+            self.assertEqual([("/", [0]), ("/majesty/", [2])], index.lookup("tolkien"))
+            self.assertEqual([("/", [5])], index.lookup("bilbo"))
+            self.assertEqual([], index.lookup("other"))
+            self.assertEqual('{"version": 2, "shards": 4, "hash": "fnv1a32", "pages": 2, "ids": 2}', read_file(f"{root}/public/search/index.json"))
+            # the shards without any of the changed terms are left untouched
+            self.assertTrue(any(os.stat(f"{root}/public/search/{name}").st_mtime_ns == mtime
+                                for name, mtime in mtimes.items() if name.startswith("terms-")))
+
+            # the id of a removed page is given to the next new page
+            os.remove(f"{root}/content/index.md")
+            self.assertEqual((0, 1), build_search_index(f"{root}/content", f"{root}/public", state_path, shards=4))
+            self.assertEqual([None, ["/majesty/", "The Majesty"]], search_index._read_gzip_json(f"{root}/public/search/pages.json.gz"))
+            write_file(f"{root}/content/new.md", "# New\n\nTolkien again")
+            write_file(f"{root}/content/newer.md", "# Newer")
+            self.assertEqual((2, 0), build_search_index(f"{root}/content", f"{root}/public", state_path, shards=4))
+            index = SearchIndex(f"{root}/public", state_path, shards=4)
+            self.assertEqual([("/new.html", [1]), ("/majesty/", [2])], index.lookup("tolkien"))
+            self.assertEqual([], index.lookup("bilbo"))
+            self.assertEqual(3, len(search_index._read_gzip_json(f"{root}/public/search/pages.json.gz")))
+            self.assertEqual('{"version": 2, "shards": 4, "hash": "fnv1a32", "pages": 3, "ids": 3}', read_file(f"{root}/public/search/index.json"))
+
+    def test_parallel_index_matches_serial_index(self):
+        with tempfile.TemporaryDirectory() as root:
+            for i in range(12):
+                write_file(f"{root}/content/dir{i % 3}/page{i}.md", f"# Page {i}\n\nword{i % 4} *shared* text {i}")
+
+            search_index.INDEX_BATCH_SIZE, batch_size = 5, search_index.INDEX_BATCH_SIZE
+            try:
+                build_search_index(f"{root}/content", f"{root}/serial", f"{root}/serial.json", shards=3)
+                build_search_index(f"{root}/content", f"{root}/parallel", f"{root}/parallel.json", shards=3, jobs=2)
+            finally:
+                search_index.INDEX_BATCH_SIZE = batch_size
+
+            for name in sorted(os.listdir(f"{root}/serial/search")):
+                with open(f"{root}/serial/search/{name}", "rb") as serial, open(f"{root}/parallel/search/{name}", "rb") as parallel:
+                    self.assertEqual(serial.read(), parallel.read())
+
+            # the index is built again when its files were erased with the outputs
+            index = SearchIndex(f"{root}/parallel", f"{root}/parallel.json", shards=3)
+            self.assertEqual(12, len(index.pages))
+            os.remove(f"{root}/parallel/search/index.json")
+            self.assertEqual((12, 0), build_search_index(f"{root}/content", f"{root}/parallel", f"{root}/parallel.json", shards=3))
+
+            # and from scratch when its state is corrupted
+            write_file(f"{root}/parallel.json", '{"version": 2, "sha')
+            self.assertEqual((12, 0), build_search_index(f"{root}/content", f"{root}/parallel", f"{root}/parallel.json", shards=3))
+            self.assertFalse(os.path.exists(f"{root}/parallel.json.tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import io
+import os
+import tempfile
+
+from site_generator.htmlnode import LeafNode, ParentNode
+from site_generator.template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title><body>{{ Content }}</body>{{Footer}}{{ Unknown }}")
+        content = ParentNode("div", [LeafNode("p", "a")])
+        values = {"Title" : "Home", "Content" : content, "Footer" : "<footer></footer>"}
+
+        expected_html = "<title> Home </title><body><div><p>a</p></div></body><footer></footer>{{ Unknown }}"
+
+        self.assertEqual(["<title> ", "Title", " </title><body>", "Content", "</body>", "Footer", "", "Unknown", ""], template.segments)
+        self.assertEqual(expected_html, template.render(values))
+
+        buffer = io.StringIO()
+        template.write(buffer, values)
+        self.assertEqual(expected_html, buffer.getvalue())
+
+    def test_derive(self):
+        template = Template("<p>{{ Content }}</p>")
+        upper = template.derive("upper", "a", str.upper)
+        self.assertEqual("<P>x</P>", upper.render({"Content" : "x"}))
+        self.assertIs(upper, template.derive("upper", "a", str.upper))
+
+        # a new key replaces the derived copy
+        self.assertIsNot(upper, template.derive("upper", "b", str.upper))
+        self.assertEqual(["upper"], list(template.derived))
+
+    def test_load_template_cache(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = f"{root}/template.html"
+            with open(path, "w") as file:
+                file.write("{{ Content }}")
+
+            template = load_template(path)
+            self.assertIs(template, load_template(path))
+
+            with open(path, "w") as file:
+                file.write("<p>{{ Content }}</p>")
+            # make sure the modification time changes even on coarse grained filesystems
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+            self.assertIsNot(template, load_template(path))
+            self.assertEqual("<p>a</p>", load_template(path).render({"Content" : "a"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 import os
+import io
 
 
-from site_generator.textnode import TextNode, TextNodeType, MDBlockType
+from site_generator.textnode import TextNode, TextNodeType, MDBlockType, MDBlock
 from site_generator import textnode_utils
 
 
@@ -25,6 +26,18 @@ class TestTextNode(unittest.TestCase):
         self.assertNotEqual(node5, node6) # same text, same text type, different url
         self.assertEqual(node6, node7) # same text, same text type, same url
 
+    def test_slots(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+
+        # links and images to the same target share a single read-only props mapping
+        link1 = textnode_utils.text_node_to_html_node(TextNode("a", TextNodeType.link, "https://boot.dev"))
+        link2 = textnode_utils.text_node_to_html_node(TextNode("b", TextNodeType.link, "https://boot.dev"))
+        self.assertIs(link1.props, link2.props)
+        self.assertEqual({"href" : "https://boot.dev"}, dict(link1.props))
+        with self.assertRaises(TypeError):
+            link1.props["href"] = "https://other"
+
 
 class TestTextNodeUtils(unittest.TestCase):
 
@@ -273,6 +286,31 @@ class TestTextNodeUtils(unittest.TestCase):
                         ]
         self.assertListEqual(nodes, expected_nodes)
 
+        text2 = "`a*b` and **see [docs](https://boot.dev) now** with ![](empty.png)"
+        nodes2 = textnode_utils.text_to_textnode(text2)
+        expected_nodes2 = [
+                            TextNode("a*b", TextNodeType.code),
+                            TextNode(" and ", TextNodeType.text),
+                            TextNode("see ", TextNodeType.bold),
+                            TextNode("docs", TextNodeType.link, "https://boot.dev"),
+                            TextNode(" now", TextNodeType.bold),
+                            TextNode(" with ", TextNodeType.text),
+                        ]
+        self.assertListEqual(nodes2, expected_nodes2)
+
+        with self.assertRaises(Exception):
+            textnode_utils.text_to_textnode("an **unclosed delimiter")
+
+        # a delimiter is closed only by a run of as many '*', the chained splits used to count
+        # the '*' of the whole text instead: the first two were accepted, the last two rejected
+        with self.assertRaises(Exception):
+            textnode_utils.text_to_textnode("* ***")
+        with self.assertRaises(Exception):
+            textnode_utils.text_to_textnode("**b*** *")
+        self.assertListEqual([TextNode("a *b* c", TextNodeType.bold)], textnode_utils.text_to_textnode("**a *b* c**"))
+        self.assertListEqual([TextNode("italic", TextNodeType.italic), TextNode(" and ***", TextNodeType.text)],
+                             textnode_utils.text_to_textnode("*italic* and ***"))
+
 
     def test_markdown_to_blocks(self):
 
@@ -292,6 +330,28 @@ class TestTextNodeUtils(unittest.TestCase):
         self.assertListEqual(list, expected_list)
 
     
+    def test_scan_markdown_blocks(self):
+
+        markdown = "# Header\n\n  some text\nmore text  \n \n```\ncode\n\nmore code\n```\n\n1. a\n2. b\n"
+        blocks = textnode_utils.scan_markdown_blocks(markdown)
+        expected_blocks = [
+            MDBlock("# Header", MDBlockType.heading, 1, 1),
+            MDBlock("some text\nmore text", MDBlockType.paragraph, 3, 4),
+            MDBlock("```\ncode\n\nmore code\n```", MDBlockType.code, 6, 10),
+            MDBlock("1. a\n2. b", MDBlockType.ordered_list, 12, 13),
+        ]
+
+        self.assertListEqual(blocks, expected_blocks)
+
+        # an unclosed fence does not swallow the rest of the document
+        blocks = textnode_utils.scan_markdown_blocks("```\na\n\nb")
+        self.assertListEqual([MDBlock("```\na", MDBlockType.paragraph, 1, 2), MDBlock("b", MDBlockType.paragraph, 4, 4)], blocks)
+
+        # lines read from a file keep their newline
+        lines = io.StringIO(markdown)
+        self.assertListEqual(expected_blocks, list(textnode_utils.iter_markdown_blocks(lines)))
+
+    
     def test_block_to_block_type(self):
 
         heading1 = "# a"
@@ -0,0 +1,5 @@
+#!/usr/bin/bash
+
+export PYTHONPATH=$(pwd)/src
+
+python src/site_generator/main.py --watch "$@"